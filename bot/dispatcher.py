@@ -0,0 +1,132 @@
+import asyncio
+from collections import deque
+
+
+DROP_OLDEST = "DROP_OLDEST"
+SHED_LOGGING = "SHED_LOGGING"
+
+
+class ChatQueue:
+    """Pending events of one chat and its counters"""
+
+    __slots__ = ("events", "worker", "held", "shedding", "processed", "dropped", "max_depth")
+
+    def __init__(self):
+        self.events = deque()
+        self.worker = None
+        self.held = False
+        self.shedding = False
+        self.processed = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+
+class Dispatcher:
+    """Per-chat ordered queues, each drained by its own worker task
+
+    Events of one chat are handled strictly in order while chats proceed in
+    parallel. A worker exists only while its chat has pending events and
+    the chat is not held. Once a queue holds `max_queue` events the overflow
+    rule applies:
+
+    DROP_OLDEST  - drop the oldest droppable event to make room
+    SHED_LOGGING - keep every event but process the chat without per-message
+                   logging until the queue is back under half of max_queue;
+                   past four times max_queue events are dropped as above
+
+    Events submitted with droppable=False (Game 4 answers) are never dropped.
+    If none of the queued events can be dropped, a new droppable event is
+    dropped instead, and a new undroppable one is queued past the limit.
+    """
+
+    def __init__(self, logger, max_queue=1000, overflow=DROP_OLDEST):
+        self.logger = logger
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.chats = {}
+
+    def submit(self, chat_id, event, handler, droppable=True):
+        """Queue handler(event) behind the chat's other events"""
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = ChatQueue()
+
+        limit = self.max_queue
+        if self.overflow == SHED_LOGGING:
+            if len(chat.events) >= self.max_queue and not chat.shedding:
+                chat.shedding = True
+                self.logger.warning(f"Chat {chat_id} is {len(chat.events)} messages behind, shedding logging.")
+            limit = self.max_queue * 4
+        if len(chat.events) >= limit and not self._drop(chat_id, chat, droppable):
+            return
+
+        chat.events.append((event, handler, droppable))
+        chat.max_depth = max(chat.max_depth, len(chat.events))
+        if chat.worker is None and not chat.held:
+            chat.worker = asyncio.create_task(self._work(chat_id, chat))
+
+    def hold(self, chat_id):
+        """Queue a chat's events without processing them until release()"""
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = ChatQueue()
+        chat.held = True
+
+    def release(self, chat_id):
+        """Start processing the events queued while the chat was held"""
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            return
+        chat.held = False
+        if chat.events and chat.worker is None:
+            chat.worker = asyncio.create_task(self._work(chat_id, chat))
+
+    def _drop(self, chat_id, chat, incoming_droppable):
+        """Make room in a full queue; returns False if the incoming event is the one dropped"""
+        for index, (_, _, droppable) in enumerate(chat.events):
+            if droppable:
+                del chat.events[index]
+                accepted = True
+                break
+        else:
+            if not incoming_droppable:
+                return True
+            accepted = False
+        chat.dropped += 1
+        if chat.dropped == 1 or chat.dropped % 100 == 0:
+            self.logger.warning(f"Chat {chat_id} queue is full, {chat.dropped} messages dropped so far.")
+        return accepted
+
+    async def _work(self, chat_id, chat):
+        try:
+            while chat.events:
+                event, handler, _ = chat.events.popleft()
+                try:
+                    await handler(event)
+                except Exception as e:
+                    self.logger.error(f"Error handling message in {chat_id}: {e}")
+                chat.processed += 1
+                if chat.shedding and len(chat.events) < self.max_queue // 2:
+                    chat.shedding = False
+                    self.logger.info(f"Chat {chat_id} caught up, logging resumed.")
+        finally:
+            chat.worker = None
+
+    def shedding(self, chat_id):
+        """Check whether a chat is currently processed without per-message logging"""
+        chat = self.chats.get(chat_id)
+        return chat is not None and chat.shedding
+
+    def stats(self):
+        """Return queue depth and drop counters per chat"""
+        return {
+            chat_id: {
+                "depth": len(chat.events),
+                "max_depth": chat.max_depth,
+                "processed": chat.processed,
+                "dropped": chat.dropped,
+                "shedding": chat.shedding,
+                "held": chat.held,
+            }
+            for chat_id, chat in self.chats.items()
+        }
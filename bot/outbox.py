@@ -0,0 +1,219 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from telethon.errors import FloodWaitError
+
+
+# Lower values are sent first
+PRIORITY_WIN = 0
+PRIORITY_GAME = 1
+PRIORITY_HINT = 2
+PRIORITY_STATUS = 3
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """Seconds until a token is available"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self._refill()
+        self.tokens -= 1
+
+
+class OutboundMessage:
+    """A message waiting in the outbox"""
+
+    __slots__ = ('chat_id', 'text', 'priority', 'coalesce_key', 'enqueued_at', 'attempts')
+
+    def __init__(self, chat_id, text, priority, coalesce_key):
+        self.chat_id = chat_id
+        self.text = text
+        self.priority = priority
+        self.coalesce_key = coalesce_key
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class Outbox:
+    """Outbound message queue with priorities, rate limits and FloodWait backoff
+
+    Handlers call send() and return immediately; a single worker task delivers
+    queued messages in priority order within global and per-chat rate limits.
+    """
+
+    def __init__(self, client, logger, global_rate=25, global_burst=25,
+                 chat_rate=20 / 60, chat_burst=3, max_retries=3):
+        self.client = client
+        self.logger = logger
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chat_buckets = {}
+        self.max_retries = max_retries
+
+        self._heap = []
+        self._seq = itertools.count()
+        self._pending = {}
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._backoff_until = 0
+
+        # Metrics
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.flood_waits = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def send(self, chat_id, text, priority=PRIORITY_GAME, coalesce_key=None):
+        """Queue a message; messages sharing a coalesce_key replace the queued one"""
+        if coalesce_key is not None:
+            queued = self._pending.get((chat_id, coalesce_key))
+            if queued is not None:
+                queued.text = text
+                self.coalesced += 1
+                return
+
+        message = OutboundMessage(chat_id, text, priority, coalesce_key)
+        if coalesce_key is not None:
+            self._pending[(chat_id, coalesce_key)] = message
+        self._push(message)
+
+    def _push(self, message):
+        heapq.heappush(self._heap, (message.priority, next(self._seq), message))
+        self._idle.clear()
+        self._wakeup.set()
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _next_ready(self):
+        """Pop the highest-priority message whose chat has a token, or return the wait time"""
+        skipped = []
+        message = None
+        wait = None
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            delay = self._chat_bucket(entry[2].chat_id).delay()
+            if delay == 0:
+                message = entry[2]
+                break
+            skipped.append(entry)
+            wait = delay if wait is None else min(wait, delay)
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        return message, wait
+
+    async def run(self):
+        """Deliver queued messages until cancelled"""
+        while True:
+            if not self._heap:
+                self._idle.set()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            backoff = self._backoff_until - time.monotonic()
+            if backoff > 0:
+                await asyncio.sleep(backoff)
+                continue
+
+            delay = self.global_bucket.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            message, wait = self._next_ready()
+            if message is None:
+                await self._sleep_or_wakeup(wait)
+                continue
+
+            await self._deliver(message)
+
+    async def _sleep_or_wakeup(self, timeout):
+        """Wait for a chat bucket to refill, waking early if a new message is queued"""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _deliver(self, message):
+        if message.coalesce_key is not None:
+            self._pending.pop((message.chat_id, message.coalesce_key), None)
+
+        self.global_bucket.consume()
+        self._chat_bucket(message.chat_id).consume()
+        message.attempts += 1
+        try:
+            await self.client.send_message(message.chat_id, message.text)
+        except FloodWaitError as e:
+            self.flood_waits += 1
+            self._backoff_until = time.monotonic() + e.seconds
+            self.logger.warning(f"FloodWait for {e.seconds}s, backing off outbound messages.")
+            self._requeue(message)
+            return
+        except Exception as e:
+            if message.attempts < self.max_retries:
+                self.logger.warning(f"Error sending message to {message.chat_id}, retrying: {e}")
+                self._requeue(message)
+            else:
+                self.failed += 1
+                self.logger.error(f"Error sending message to {message.chat_id}: {e}")
+            return
+
+        latency = time.monotonic() - message.enqueued_at
+        self.sent += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def _requeue(self, message):
+        """Put a failed message back, unless a newer coalesced message replaced it"""
+        if message.coalesce_key is not None:
+            key = (message.chat_id, message.coalesce_key)
+            if key in self._pending:
+                self.coalesced += 1
+                return
+            self._pending[key] = message
+        self._push(message)
+
+    async def drain(self):
+        """Wait until every queued message has been handled"""
+        await self._idle.wait()
+
+    def stats(self):
+        """Return queue depth and send-latency metrics"""
+        return {
+            "depth": len(self._heap),
+            "sent": self.sent,
+            "failed": self.failed,
+            "coalesced": self.coalesced,
+            "flood_waits": self.flood_waits,
+            "avg_latency": self.total_latency / self.sent if self.sent else 0.0,
+            "max_latency": self.max_latency,
+        }
@@ -0,0 +1,53 @@
+from array import array
+
+
+class SeenWindow:
+    """Message ids recently handled in one chat, in bounded memory
+
+    The last `size` ids are kept in a fixed array used as a ring, mirrored in a
+    set for O(1) lookups. Ids at or below `floor` count as seen: it starts at
+    the last message id processed before a restart and rises to each id that
+    falls out of the ring, so old redeliveries are still recognised.
+    """
+
+    def __init__(self, size=2048, floor=0):
+        self.ring = array('q', bytes(8 * size))
+        self.position = 0
+        self.ids = set()
+        self.floor = floor
+        self.duplicates = 0
+
+    def add(self, message_id):
+        """Record an id; returns False if it was already seen"""
+        if message_id <= self.floor or message_id in self.ids:
+            self.duplicates += 1
+            return False
+
+        evicted = self.ring[self.position]
+        if evicted:
+            self.ids.discard(evicted)
+            if evicted > self.floor:
+                self.floor = evicted
+        self.ring[self.position] = message_id
+        self.position = (self.position + 1) % len(self.ring)
+        self.ids.add(message_id)
+        return True
+
+    def resize(self, size):
+        """Change the ring size, keeping the most recent ids that still fit"""
+        size = max(size, 1)
+        ordered = [message_id for message_id in self.ring[self.position:] + self.ring[:self.position] if message_id]
+        kept = ordered[-size:]
+        for message_id in ordered[:len(ordered) - len(kept)]:
+            self.ids.discard(message_id)
+            if message_id > self.floor:
+                self.floor = message_id
+        self.ring = array('q', bytes(8 * size))
+        self.ring[:len(kept)] = array('q', kept)
+        self.position = len(kept) % size
+
+    def __contains__(self, message_id):
+        return message_id <= self.floor or message_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
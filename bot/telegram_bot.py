@@ -1,286 +1,577 @@
 import asyncio
+import time
+from functools import partial
 from datetime import datetime
 from pytz import timezone
 from telethon import TelegramClient, events
 
+from bot.dispatcher import Dispatcher
+from bot.outbox import Outbox, PRIORITY_WIN, PRIORITY_GAME, PRIORITY_HINT, PRIORITY_STATUS
+from config.reloader import ConfigReloader
+from games.message_view import MessageView
+from services.user_stats import FIELDS as STATS_FIELDS
+
 
 class TelegramBot:
     """Main bot class that handles Telegram interactions"""
     
-    def __init__(self, config, logger, game_controller, counter):
+    def __init__(self, config, logger, sessions, entity_cache, state_store, user_stats, scheduler, logger_instance):
         self.config = config
         self.logger = logger
-        self.game_controller = game_controller
-        self.counter = counter
+        self.logger_instance = logger_instance
+        self.sessions = sessions
+        self.entity_cache = entity_cache
+        self.state_store = state_store
+        self.user_stats = user_stats
+        self.scheduler = scheduler
+        self.scheduler.register("hint", self.send_hint)
+        self.scheduler.register("status", self.send_status)
+        self.scheduler.register("state_flush", lambda payload: self.state_store.flush())
+        self.scheduler.register("stats_flush", lambda payload: self.user_stats.flush())
+        self.my_id = int(config.my_id) if config.my_id else None
+        self.private_id = int(config.private_id) if config.private_id else None
+        self.game_handlers = {
+            1: self.play_game_1,
+            2: self.play_game_2,
+            3: self.play_game_3,
+            4: self.play_game_4,
+        }
         
         # Initialize Telegram client
         self.client = TelegramClient('session_name', config.api_id, config.api_hash)
+        self.outbox = Outbox(
+            self.client,
+            logger,
+            global_rate=config.outbox_global_rate,
+            global_burst=config.outbox_global_burst,
+            chat_rate=config.outbox_chat_rate,
+            chat_burst=config.outbox_chat_burst,
+        )
+        self.dispatcher = Dispatcher(logger, config.dispatch_max_queue, config.dispatch_overflow)
         
     async def start(self):
         """Start the bot and register handlers"""
         await self.client.start()
         self.logger.info("Client started successfully.")
+        asyncio.create_task(self.outbox.run())
+        self.scheduler.schedule("state_flush", "state_flush", every=self.config.state_flush_interval, persist=False)
+        self.scheduler.schedule("stats_flush", "stats_flush", every=self.config.stats_flush_interval, persist=False)
         
-        # Send introduction message
-        await self.send_intro_message()
+        # Send introduction messages
+        for session in self.sessions.active():
+            await self.send_intro_message(session)
         
-        # Register message handler
+        # Register message handler; chats with a resumed game hold live
+        # messages in their queue until the ones missed while offline have
+        # been replayed
+        for session in self.sessions.active():
+            session.seen.floor = session.last_message_id
+            session.replaying = session.last_message_id > 0
+            if session.replaying:
+                self.dispatcher.hold(session.chat_id)
+        # Started once the replaying chats are known, so their overdue hints wait for catch-up
+        asyncio.create_task(self.scheduler.run())
         self.client.add_event_handler(self.handle_new_message, events.NewMessage)
+        # Always registered: EDIT_RULE is checked per edit and can change on reload
+        self.client.add_event_handler(self.handle_edited_message, events.MessageEdited)
+        for session in self.sessions.active():
+            if session.replaying:
+                await self.catch_up(session)
         
-        # Start background tasks
-        asyncio.create_task(self.send_hourly_message())
-        asyncio.create_task(self.schedule_hint())
+        # Start background tasks; a status job restored from the last run keeps its time
+        status = self.scheduler.jobs.get("status")
+        if status is None or status.interval != self.config.status_interval:
+            self.scheduler.schedule("status", "status", every=self.config.status_interval)
+        if self.config.config_reload_interval > 0:
+            reloader = ConfigReloader(
+                self.config, self.sessions, self.logger, self.schedule_hints,
+                interval=self.config.config_reload_interval,
+            )
+            asyncio.create_task(reloader.run())
+        for session in self.sessions.active():
+            self.schedule_hints(session)
         
         # Run until disconnected
         await self.client.run_until_disconnected()
         
     async def handle_new_message(self, event):
-        """Handle new messages in the chat"""
-        # Target chat filter
-        chat_id = int(self.config.target_chat_id if not self.config.testing else self.config.private_id)
-        if event.chat_id != chat_id:
-            self.logger.info(f"Message from {event.chat_id} ignored.")
+        """Route a new message to the game running in its chat"""
+        if event.chat_id == self.private_id and (event.raw_text or "").startswith("/stats"):
+            await self.send_stats(event)
             return
         
-        # Self message filter
-        if not self.config.testing:
-            if event.sender_id == int(self.config.my_id) and self.config.count_user == "FALSE":
-                self.logger.info(f"Message from self ignored.")
-                return
+        session = self.sessions.get(event.chat_id)
+        if session is None:
+            self.logger.debug(f"Message from {event.chat_id} ignored.")
+            return
         
-        # Ignore ignored users
-        sender = await self.get_user_name(event)
-        if sender in self.config.ignored_users:
-            self.logger.info(f"Message from ignored user {sender} ignored.")
+        self.dispatch(session, event)
+        
+    def dispatch(self, session, event):
+        """Queue a message behind the chat's earlier ones; Game 4 guesses are never dropped"""
+        view = MessageView.of(event)
+        droppable = not (session.config.game == 4 and session.controller.is_answer(view))
+        self.dispatcher.submit(session.chat_id, view, partial(self.process_message, session), droppable)
+        
+    async def process_message(self, session, view):
+        """Count a message and run the chat's game on it"""
+        event = view.event
+        # Messages queued behind the one that finished the game are not played
+        if not session.active:
             return
-
         
+        # Updates can be delivered again after a reconnect, and catch-up can
+        # both replay and hold the same message
+        if not session.seen.add(event.id):
+            self.logger.debug(f"Duplicate message {event.id} in {session.chat_id} ignored.")
+            return
+        
+        if await self.is_ignored(session, event):
+            return
+
         # Log message
         sender_name = await self.get_user_name(event)
-        chat_name = await self.get_chat_name(event)
-        self.logger.info(f"Message in {chat_name} from {sender_name}: {event.raw_text}")
+        if not session.replaying and not self.dispatcher.shedding(session.chat_id):
+            chat_name = await self.get_chat_name(event)
+            self.logger.debug(f"Message in {chat_name} from {sender_name}: {view.text}")
         
         # Handle message based on game type
-        self.counter.increment()
+        session.counter.increment()
+        session.last_message_id = max(session.last_message_id, event.id)
+        self.user_stats.message(session.chat_id, event.sender_id, sender_name)
         
-        if self.config.game == 1:
-            if await self.game_controller.check_trigger(event):
-                await self.send_game_1_win_message(event)
-                await self.client.disconnect()
-                
-        elif self.config.game == 2:
-            if await self.game_controller.check_target_count():
-                await self.send_game_2_win_message(event)
-                await self.client.disconnect()
-                
-        elif self.config.game == 3:
-            if await self.game_controller.check_buffer(event):
-                await self.send_game_3_win_message(event)
-                await self.client.disconnect()
-                
-        elif self.config.game == 4:
-            if self.game_controller.loser != "":
-                if await self.game_controller.check_correct_answer(event):
-                    await self.send_game_4_correct_answer_message(event)
-                    await self.client.disconnect()
-                    return
-                    
-            if await self.game_controller.check_trigger_condition(event):
-                self.logger.info(f"Trigger condition value: {self.config.trigger_condition_value}")
-                await self.send_game_4_trigger_message(event)
-        else:
+        play = self.game_handlers.get(session.config.game)
+        if play is None:
             self.logger.error("Invalid GAME value specified.")
+        else:
+            await play(session, view)
+            
+        if not session.replaying and not self.dispatcher.shedding(session.chat_id):
+            self.logger.debug(f"Message count: {session.counter.message_count}")
+        
+    async def handle_edited_message(self, event):
+        """Queue an edited message to be checked again (EDIT_RULE REEVALUATE)"""
+        session = self.sessions.get(event.chat_id)
+        if session is None or session.replaying or session.config.edit_rule != "REEVALUATE":
+            return
+        self.dispatcher.submit(session.chat_id, MessageView.of(event), partial(self.reevaluate_message, session))
+        
+    async def reevaluate_message(self, session, view):
+        """Run the game again on an edited message without counting it"""
+        event = view.event
+        if not session.active or await self.is_ignored(session, event):
+            return
+        
+        self.logger.debug(f"Message {event.id} in {session.chat_id} edited: {view.text}")
+        game = session.config.game
+        if game == 2:
+            # Only the position of a message matters, which an edit cannot change
+            return
+        if game == 3:
+            # An edit that adds the word resets the buffer but never advances it
+            if await session.controller.check_trigger(view):
+                session.counter.last_trigger = 0
+            return
+        play = self.game_handlers.get(game)
+        if play is not None:
+            await play(session, view)
+        
+    async def is_ignored(self, session, event):
+        """Check the self filter and the chat's ignored users"""
+        # Self message filter
+        if not self.config.testing:
+            if event.sender_id == self.my_id and session.config.count_user == "FALSE":
+                self.logger.info(f"Message from self ignored.")
+                return True
+        
+        # Ignore ignored users
+        sender_name = await self.get_user_name(event)
+        if sender_name in session.config.ignored_users:
+            self.logger.info(f"Message from ignored user {sender_name} ignored.")
+            return True
+        return False
+        
+    async def catch_up(self, session):
+        """Replay the messages sent while the bot was offline, oldest first
+
+        Replayed messages count and move the game as usual, but nothing is
+        logged per message and only win messages are sent, so live traffic in
+        the chat, such as hints, is unaffected. Replay stops after
+        CATCH_UP_LIMIT messages or CATCH_UP_TIMEOUT seconds. Live messages that
+        arrived meanwhile wait in the chat's queue and are processed afterwards.
+        """
+        chat_id = session.chat_id
+        start_id = session.last_message_id
+        self.logger.info(f"Catching up on chat {chat_id} from message {start_id}.")
+        replayed = 0
+        started = time.monotonic()
+        try:
+            async for message in self.client.iter_messages(
+                chat_id, min_id=start_id, reverse=True, limit=self.config.catch_up_limit
+            ):
+                if not session.active:
+                    break
+                if message.action:
+                    continue
+                await self.process_message(session, MessageView.of(message))
+                replayed += 1
+                if replayed % self.config.catch_up_progress == 0:
+                    self.logger.info(f"Catch-up in chat {chat_id}: {replayed} messages replayed.")
+                if time.monotonic() - started > self.config.catch_up_timeout:
+                    self.logger.warning(f"Catch-up in chat {chat_id} ran out of time after {replayed} messages.")
+                    break
+            else:
+                if replayed >= self.config.catch_up_limit:
+                    self.logger.warning(f"Catch-up in chat {chat_id} stopped at the limit of {replayed} messages.")
+        except Exception as e:
+            self.logger.error(f"Error catching up chat {chat_id}: {e}")
+        finally:
+            session.replaying = False
+            self.dispatcher.release(chat_id)
+        
+        outcome = "game finished" if not session.active else f"message count {session.counter.message_count}"
+        self.logger.info(
+            f"Caught up {replayed} messages in chat {chat_id} in {time.monotonic() - started:.1f}s: {outcome}."
+        )
+
+        
+    async def play_game_1(self, session, view):
+        """Game 1: end the game when the trigger is sent"""
+        if await session.controller.check_trigger(view):
+            self.user_stats.add(session.chat_id, view.event.sender_id, "triggers")
+            await self.send_game_1_win_message(session, view.event)
+            await self.finish_game(session)
             
-        self.logger.info(f"Message count: {self.counter.message_count}")
+    async def play_game_2(self, session, view):
+        """Game 2: end the game on the target message"""
+        if await session.controller.check_target_count():
+            self.user_stats.add(session.chat_id, view.event.sender_id, "triggers")
+            await self.send_game_2_win_message(session, view.event)
+            await self.finish_game(session)
+        elif abs(session.counter.target_count - session.counter.message_count) <= session.config.near_miss_range:
+            self.user_stats.add(session.chat_id, view.event.sender_id, "near_misses")
+            
+    async def play_game_3(self, session, view):
+        """Game 3: end the game when the buffer runs out"""
+        if await session.controller.check_buffer(view):
+            self.user_stats.add(session.chat_id, view.event.sender_id, "triggers")
+            await self.send_game_3_win_message(session, view.event)
+            await self.finish_game(session)
+            
+    async def play_game_4(self, session, view):
+        """Game 4: pick a new loser on trigger, end the game on a correct answer"""
+        if session.controller.loser != "" and session.controller.is_answer(view):
+            # Scored in the chat's own worker, so later messages in this chat wait
+            # for the verdict while other chats carry on
+            await self.score_game_4_answer(session, view)
+            return
+        
+        await self.check_game_4_trigger(session, view)
+        
+    async def score_game_4_answer(self, session, view):
+        """Game 4: end the game if a guess is correct, otherwise treat it as a normal message"""
+        correct = await session.controller.check_correct_answer(view)
+        # Another message may have ended the game while this guess was being scored
+        if not session.active:
+            return
+        if correct:
+            self.user_stats.add(session.chat_id, view.event.sender_id, "correct_guesses")
+            await self.send_game_4_correct_answer_message(session, view.event)
+            await self.finish_game(session)
+            return
+        
+        await self.check_game_4_trigger(session, view)
+        
+    async def check_game_4_trigger(self, session, view):
+        """Game 4: make the sender the loser if the message meets the trigger condition"""
+        if await session.controller.check_trigger_condition(view):
+            self.logger.info(f"Trigger condition value: {session.config.trigger_condition_value}")
+            self.user_stats.add(session.chat_id, view.event.sender_id, "triggers")
+            self.user_stats.add(session.chat_id, view.event.sender_id, "losses")
+            await self.send_game_4_trigger_message(session, view.event)
+            
+    async def finish_game(self, session):
+        """Stop routing messages to a finished game; disconnect once no games are left"""
+        self.sessions.stop(session.chat_id)
+        session.counter.close()
+        self.state_store.flush()
+        self.scheduler.cancel_prefix(f"hint:{session.chat_id}:")
+        self.logger.info(f"Game in chat {session.chat_id} finished.")
+        if not self.sessions.active():
+            self.logger.info("All games finished, disconnecting.")
+            await self.outbox.drain()
+            await self.client.disconnect()
 
-    async def send_game_1_win_message(self, event):
+    async def send_game_1_win_message(self, session, event):
         """Send win message for Game 1"""
-        chat_id = int(self.config.target_chat_id if not self.config.testing else self.config.private_id)
-        await self.client.send_message(
+        chat_id = session.chat_id
+        self.outbox.send(
             chat_id,
-            f"{self.config.message}\nIt took {self.counter.message_count} messages to find this.\nThanks for playing!"
+            f"{session.config.message}\nIt took {session.counter.message_count} messages to find this.\nThanks for playing!",
+            PRIORITY_WIN
         )
         
-    async def send_game_2_win_message(self, event):
+    async def send_game_2_win_message(self, session, event):
         """Send win message for Game 2"""
-        chat_id = int(self.config.target_chat_id if not self.config.testing else self.config.private_id)
+        chat_id = session.chat_id
         name = await self.get_user_name(event)
-        await self.client.send_message(
+        self.outbox.send(
             chat_id,
-            f"You've sent the {self.counter.message_count}th message. \nThanks @{name} for paying next supper too!"
+            f"You've sent the {session.counter.message_count}th message. \nThanks @{name} for paying next supper too!",
+            PRIORITY_WIN
         )
-        self.logger.info(f"Target count reached: {self.counter.target_count} messages!")
+        self.logger.info(f"Target count reached: {session.counter.target_count} messages!")
         
-    async def send_game_3_win_message(self, event):
+    async def send_game_3_win_message(self, session, event):
         """Send win message for Game 3"""
-        chat_id = int(self.config.target_chat_id if not self.config.testing else self.config.private_id)
+        chat_id = session.chat_id
         name = await self.get_user_name(event)
-        await self.client.send_message(
+        self.outbox.send(
             chat_id,
-            f"It's been too long since {self.config.trigger_word}, Thanks @{name} for paying next supper too!"
+            f"It's been too long since {session.config.trigger_word}, Thanks @{name} for paying next supper too!",
+            PRIORITY_WIN
         )
         
-    async def send_game_4_trigger_message(self, event):
-        """Send trigger message for Game 4"""
-        chat_id = int(self.config.target_chat_id if not self.config.testing else self.config.private_id)
+    async def send_game_4_trigger_message(self, session, event):
+        """Send trigger message for Game 4; a replayed trigger only takes over as the loser"""
+        chat_id = session.chat_id
         user = await self.get_user_name(event)
-        self.game_controller.loser = user
-        await self.client.send_message(
+        session.controller.loser = user
+        if session.replaying:
+            return
+        self.outbox.send(
             chat_id,
-            f"{self.config.message}\nDamn @{user} why did you trigger the bot? \n"
+            f"{session.config.message}\nDamn @{user} why did you trigger the bot? \n"
             f"Next person to trigger the bot will take over as the loser.\n"
             f"If anyone can guess why the bot was triggered, you get a prize.\n"
-            f"If you want to guess the answer, start your message with 'answer'. The bot will be quite lenient"
+            f"If you want to guess the answer, start your message with 'answer'. The bot will be quite lenient",
+            PRIORITY_GAME
         )
         
-    async def send_game_4_correct_answer_message(self, event):
+    async def send_game_4_correct_answer_message(self, session, event):
         """Send correct answer message for Game 4"""
-        chat_id = int(self.config.target_chat_id if not self.config.testing else self.config.private_id)
+        chat_id = session.chat_id
         winner = await self.get_user_name(event)
         text = event.raw_text or ""
         
-        if winner == self.game_controller.loser:
-            if self.config.trigger_condition in ["DOTS", "SPACES", "LETTERS", "DIGITS", "WORDS", "LOOPS"]:
+        if winner == session.controller.loser:
+            if session.config.trigger_condition in ["DOTS", "SPACES", "LETTERS", "DIGITS", "WORDS", "LOOPS"]:
                 message = (
                     f"No punishment for you @{winner}, you guessed the answer correctly! \n"
                     f"Thanks for playing!\n"
                     f"The answer was: {text}\n"
-                    f"The bot was triggered by: {self.config.trigger_condition_value} {self.config.trigger_condition} in the message."
+                    f"The bot was triggered by: {session.config.trigger_condition_value} {session.config.trigger_condition} in the message."
                 )
-            elif self.config.trigger_condition == "ALPHABET":
+            elif session.config.trigger_condition == "ALPHABET":
                 message = (
                     f"No punishment for you @{winner}, you guessed the answer correctly! \n"
                     f"Thanks for playing!\n"
                     f"The answer was: {text}\n"
                     f"The bot was triggered by: The first letter in each word is in "
-                    f"Alphabetical order with more than {self.config.trigger_condition_value} words."
+                    f"Alphabetical order with more than {session.config.trigger_condition_value} words."
                 )
             else:
                 message = (
                     f"No punishment for you @{winner}, you guessed the answer correctly! \n"
                     f"Thanks for playing!\n"
                     f"The answer was: {text}\n"
-                    f"The bot was triggered by: The vowels in your message spell {self.config.trigger_condition}."
+                    f"The bot was triggered by: The vowels in your message spell {session.config.trigger_condition}."
                 )
         else:
             message = (
 
             )
-            if self.config.trigger_condition in ["DOTS", "SPACES", "LETTERS", "DIGITS", "WORDS", "LOOPS"]:
+            if session.config.trigger_condition in ["DOTS", "SPACES", "LETTERS", "DIGITS", "WORDS", "LOOPS"]:
                 message = (
                     f"Correct! @{winner} guessed the answer correctly! \n"
-                    f"Now @{self.game_controller.loser} owes you bbt! \n"
+                    f"Now @{session.controller.loser} owes you bbt! \n"
                     f"Thanks for playing!\n"
-                    f"The answer was: {self.config.trigger_condition}\n"
+                    f"The answer was: {session.config.trigger_condition}\n"
                     f"The bot was triggered by: The first letter in each word is in "
-                    f"Alphabetical order with more than {self.config.trigger_condition_value} words."
+                    f"Alphabetical order with more than {session.config.trigger_condition_value} words."
                 
                 )
-            elif self.config.trigger_condition == "ALPHABET":
+            elif session.config.trigger_condition == "ALPHABET":
                 message = (
                     f"Correct! @{winner} guessed the answer correctly! \n"
-                    f"Now @{self.game_controller.loser} owes you bbt! \n"
+                    f"Now @{session.controller.loser} owes you bbt! \n"
                     f"Thanks for playing!\n"
-                    f"The answer was: {self.config.trigger_condition}\n"
+                    f"The answer was: {session.config.trigger_condition}\n"
                     f"The bot was triggered by: {text}"
                 )
             else:
                 message = (
                     f"Correct! @{winner} guessed the answer correctly! \n"
-                    f"Now @{self.game_controller.loser} owes you bbt! \n"
+                    f"Now @{session.controller.loser} owes you bbt! \n"
                     f"Thanks for playing!\n"
                     f"The answer was: {text}\n"
-                    f"The bot was triggered by: The vowels in your message spell {self.config.trigger_condition}."
+                    f"The bot was triggered by: The vowels in your message spell {session.config.trigger_condition}."
                 )
         
-        await self.client.send_message(chat_id, message)
+        self.outbox.send(chat_id, message, PRIORITY_WIN)
         self.logger.info(f"Correct answer guessed: {text}")
         
-    async def send_hourly_message(self):
-        """Send hourly status message"""
-        while True:
-            await asyncio.sleep(3600)
-            self.counter.save_message_count()
-            await self.client.send_message(
-                int(self.config.private_id),
-                f"Game is still running! Current message count: {self.counter.message_count}"
+    def send_status(self, payload):
+        """Scheduled job: send the status message and log service metrics"""
+        counts = []
+        for session in self.sessions.active():
+            counts.append(f"{session.chat_id}: {session.counter.message_count}")
+        if self.private_id is None:
+            self.logger.warning("PRIVATE_ID is not set, status update not sent.")
+        else:
+            self.outbox.send(
+                self.private_id,
+                "Game is still running! Current message count: " + ", ".join(counts),
+                PRIORITY_STATUS,
+                coalesce_key="status"
             )
-            self.logger.info("Hourly update sent.")
+            self.logger.info("Status update queued.")
+        self.logger.info(f"Logger: {self.logger_instance.stats()}")
+        self.logger.info(f"Entity cache: {self.entity_cache.stats()}")
+        self.logger.info(f"Outbox: {self.outbox.stats()}")
+        self.logger.info(f"State store: {self.state_store.stats()}")
+        self.logger.info(f"Scheduler: {self.scheduler.stats()}")
+        self.logger.info(f"Dispatcher: {self.dispatcher.stats()}")
+        count_logs = {session.chat_id: session.counter.wal.stats() for session in self.sessions.active()}
+        self.logger.info(f"Message count logs: {count_logs}")
+        duplicates = {session.chat_id: session.seen.duplicates for session in self.sessions.active()}
+        self.logger.info(f"Duplicate messages dropped: {duplicates}")
+        embedding_services = {}
+        feature_pools = set()
+        for session in self.sessions.active():
+            if session.controller.feature_pool is not None:
+                feature_pools.add(session.controller.feature_pool)
+            if session.controller.answer_cascade is not None:
+                self.logger.info(f"Answer cascade {session.chat_id}: {session.controller.answer_cascade.stats()}")
+            if session.controller.embedding_service is not None:
+                embedding_services[session.config.trigger_condition] = session.controller.embedding_service
+        for condition, embedding_service in embedding_services.items():
+            self.logger.info(f"Answer memo {condition}: {embedding_service.memo.stats()}")
+        for feature_pool in feature_pools:
+            self.logger.info(f"Feature pool: {feature_pool.stats()}")
     
-    async def schedule_hint(self):
-        """Schedule hints based on configuration"""
-        if not self.config.hints:
+    def schedule_hints(self, session):
+        """Schedule a chat's hints as one-shot jobs
+
+        Hints already sent, or pending from the last run with the same time and
+        text, are left alone; pending hints no longer in the config are cancelled.
+        """
+        prefix = f"hint:{session.chat_id}:"
+        hints = session.config.hints or {}
+        wanted = {prefix + str(hint_id) for hint_id in hints}
+        for job_id in [job_id for job_id in self.scheduler.jobs if job_id.startswith(prefix)]:
+            if job_id not in wanted:
+                self.scheduler.cancel(job_id)
+        if not hints:
             self.logger.warning("No hints provided in the config.")
             return
           
         sg_tz = timezone('Asia/Singapore')
-        for hint_id, hint_details in self.config.hints.items():
+        now = time.time()
+        for hint_id, hint_details in hints.items():
+            job_id = prefix + str(hint_id)
             try:
                 hint_datetime = datetime.strptime(
                     f"{hint_details['DATE']} {hint_details['TIME']}", "%d/%m/%Y %H:%M"
                 )
                 hint_datetime = sg_tz.localize(hint_datetime)
-                now = datetime.now(sg_tz)
-                delay = (hint_datetime - now).total_seconds()
-
-                if delay > 0:
-                    asyncio.create_task(self.send_hint_after_delay(hint_details['HINT'], delay))
+                due = hint_datetime.timestamp()
+                payload = {"chat_id": session.chat_id, "hint": hint_details['HINT']}
+                
+                pending = self.scheduler.jobs.get(job_id)
+                if self.scheduler.ran(job_id, due):
+                    self.logger.debug(f"Hint {hint_id} was already sent.")
+                elif pending is not None and pending.due == due and pending.payload == payload:
+                    self.logger.info(f"Hint {hint_id} is still scheduled for {hint_datetime}.")
+                elif due > now:
+                    self.scheduler.schedule(job_id, "hint", payload, at=due)
                     self.logger.info(f"Scheduled hint {hint_id} for {hint_datetime}.")
                 else:
+                    self.scheduler.cancel(job_id)
                     self.logger.warning(f"Hint {hint_id} is in the past and will not be scheduled.")
             except Exception as e:
                 self.logger.error(f"Error scheduling hint {hint_id}: {e}")
 
-    async def send_hint_after_delay(self, hint, delay):
-        """Send a hint after a specified delay"""
-        await asyncio.sleep(delay)
-        chat_id = int(self.config.target_chat_id if not self.config.testing else self.config.private_id)
-        await self.client.send_message(chat_id, hint)
-        self.logger.info(f"Hint sent: {hint}")
+    def send_hint(self, payload):
+        """Scheduled job: send a hint if its chat's game is still running
+
+        Returns False, so the scheduler tries again later, while the chat is
+        still replaying the messages it missed.
+        """
+        session = self.sessions.get(payload["chat_id"])
+        if session is None:
+            return
+        if session.replaying:
+            return False
+        self.outbox.send(session.chat_id, payload["hint"], PRIORITY_HINT)
+        self.logger.info(f"Hint queued: {payload['hint']}")
+    
+    async def send_stats(self, event):
+        """Reply to /stats [field] in the private chat with per-chat leaderboards"""
+        args = (event.raw_text or "").split()[1:]
+        fields = [field for field in STATS_FIELDS if not args or field == args[0].lower()]
+        if not fields:
+            text = f"Unknown stat {args[0]}. Choose from: {', '.join(STATS_FIELDS)}"
+        else:
+            lines = []
+            for session in self.sessions:
+                lines.append(f"Chat {session.chat_id}:")
+                for field in fields:
+                    leaders = self.user_stats.top(session.chat_id, field, self.config.stats_top_k)
+                    if leaders:
+                        ranking = ", ".join(f"{name} ({value})" for name, value in leaders)
+                        lines.append(f"{field.replace('_', ' ').capitalize()}: {ranking}")
+            text = "\n".join(lines) or "No games running."
+        self.outbox.send(self.private_id, text, PRIORITY_STATUS)
+        self.logger.info("Stats queued.")
     
     async def get_user_name(self, event):
         """Get username of message sender"""
-        try:
+        async def fetch():
             sender = await event.get_sender()
-            user_name = sender.username if sender else None
-            return user_name
+            return sender.username if sender else None
+
+        try:
+            return await self.entity_cache.get_or_fetch(("user", event.sender_id), fetch)
         except Exception as e:
             self.logger.error(f"Error getting user name: {e}")
             return None
     
     async def get_chat_name(self, event):
         """Get name of chat"""
-        try:
+        async def fetch():
             chat = await event.get_chat()
-            self.logger.info(f"Chat name: {chat}")
-            chat_name = chat.title if chat else None
-            return chat_name
+            self.logger.debug(f"Fetched chat entity: {chat}")
+            return getattr(chat, 'title', None) if chat else None
+
+        try:
+            return await self.entity_cache.get_or_fetch(("chat", event.chat_id), fetch)
         except Exception as e:
             self.logger.error(f"Error getting chat name: {e}")
             return None
         
-    async def send_intro_message(self):
+    async def send_intro_message(self, session):
         """Send introduction message to the chat"""
-        chat_id = int(self.config.target_chat_id if not self.config.testing else self.config.private_id)
-        if self.config.game == 1:
+        chat_id = session.chat_id
+        if session.config.game == 1:
             message = (
                 f"Hello! This is a bot to play a game. \n"
                 f"There's a special word(s) or sticker. Don't trigger the bot\n"
                 f"Have fun playing!"
             )
-        elif self.config.game == 2:
+        elif session.config.game == 2:
             message = (
                 f"Hello! This is a bot to play a game. \n"
-                f"Send the {self.counter.target_count} message to lose!\n"
+                f"Send the {session.counter.target_count} message to lose!\n"
                 f"Have fun playing!"
             )
-        elif self.config.game == 3:
+        elif session.config.game == 3:
             message = (
                 f"Hello! This is a bot to play a game. \n"
-                f"Don't break the chain, say {self.config.trigger_word} in every {self.config.buffer} words or you lose.\n"
+                f"Don't break the chain, say {session.config.trigger_word} in every {session.config.buffer} words or you lose.\n"
                 f"Have fun playing!"
             )
-        elif self.config.game == 4:
+        elif session.config.game == 4:
             message = (
                 f"Hello! This is a bot to play a game. \n"
                 f"The bot has a special trigger. Don't trigger the bot\n"
@@ -290,9 +581,6 @@ class TelegramBot:
             self.logger.error("Invalid GAME value specified.")
             return
         
-        await self.client.send_message(
-            chat_id,
-            message
-        )    
+        self.outbox.send(chat_id, message, PRIORITY_GAME)
         
-        self.logger.info("Introduction message sent.")
\ No newline at end of file
+        self.logger.info("Introduction message queued.")
\ No newline at end of file
@@ -3,6 +3,13 @@ import os
 from dotenv import load_dotenv
 
 
+def parse_bool(value):
+    """Read a flag written either as a JSON boolean or as the strings TRUE/FALSE"""
+    if isinstance(value, str):
+        return value.strip().upper() == "TRUE"
+    return bool(value)
+
+
 class Config:
     """Manages application configuration from both env vars and config file"""
     
@@ -25,31 +32,197 @@ class Config:
         self.target_chat_id = os.getenv('TARGET_CHAT_ID')
         self.my_id = os.getenv('MY_ID')
         
+        # Logging
+        self.log_mode = self.config.get('LOG_MODE', "QUEUED").upper()
+        self.log_level = self.config.get('LOG_LEVEL', "INFO").upper()
+        self.log_queue_size = int(self.config.get('LOG_QUEUE_SIZE', 10000))
+        self.log_max_bytes = int(self.config.get('LOG_MAX_BYTES', 5_000_000))
+        self.log_backup_count = int(self.config.get('LOG_BACKUP_COUNT', 3))
+        self.log_batch_size = int(self.config.get('LOG_BATCH_SIZE', 256))
+        self.log_debug_sample_rate = float(self.config.get('LOG_DEBUG_SAMPLE_RATE', 1.0))
+        
+        # Entity cache
+        self.entity_cache_size = int(self.config.get('ENTITY_CACHE_SIZE', 1024))
+        self.entity_cache_ttl = int(self.config.get('ENTITY_CACHE_TTL', 600))
+        self.entity_cache_negative_ttl = int(self.config.get('ENTITY_CACHE_NEGATIVE_TTL', 60))
+        
+        # Game 4 embeddings
+        self.embedding_backend = self.config.get('EMBEDDING_BACKEND', "OPENAI").upper()
+        self.hashing_dim = int(self.config.get('HASHING_DIM', 1024))
+        self.embedding_cache_dir = self.config.get('EMBEDDING_CACHE_DIR', 'embedding_cache')
+        self.embedding_batch_size = int(self.config.get('EMBEDDING_BATCH_SIZE', 256))
+        self.embedding_batch_tokens = int(self.config.get('EMBEDDING_BATCH_TOKENS', 50_000))
+        self.embedding_concurrency = int(self.config.get('EMBEDDING_CONCURRENCY', 4))
+        self.embedding_batch_window = float(self.config.get('EMBEDDING_BATCH_WINDOW', 0.01))
+        self.embedding_timeout = float(self.config.get('EMBEDDING_TIMEOUT', 10.0))
+        self.embedding_max_inflight = int(self.config.get('EMBEDDING_MAX_INFLIGHT', 8))
+        self.answer_memo_bytes = int(self.config.get('ANSWER_MEMO_BYTES', 8_000_000))
+        self.answer_memo_ttl = int(self.config.get('ANSWER_MEMO_TTL', 3600))
+        self.ann_index = parse_bool(self.config.get('ANN_INDEX', False))
+        self.ann_min_references = int(self.config.get('ANN_MIN_REFERENCES', 5000))
+        self.ann_tables = int(self.config.get('ANN_TABLES', 16))
+        self.ann_bits = int(self.config.get('ANN_BITS', 12))
+        
+        # Message count persistence: group commit of the count log
+        self.count_flush_interval = float(self.config.get('COUNT_FLUSH_INTERVAL', 0.05))
+        self.count_flush_events = int(self.config.get('COUNT_FLUSH_EVENTS', 1000))
+        self.count_compact_records = int(self.config.get('COUNT_COMPACT_RECORDS', 10000))
+        
+        # Per-chat game state
+        self.state_db = self.config.get('STATE_DB', 'game_state.db')
+        self.state_flush_interval = float(self.config.get('STATE_FLUSH_INTERVAL', 1.0))
+        
+        # Seconds between checks of config.json for changes; 0 disables reloading
+        self.config_reload_interval = float(self.config.get('CONFIG_RELOAD_INTERVAL', 2.0))
+        
+        # Per-user stats, kept in STATE_DB
+        self.stats_flush_interval = float(self.config.get('STATS_FLUSH_INTERVAL', 30))
+        self.stats_top_k = int(self.config.get('STATS_TOP_K', 5))
+        
+        # Scheduled jobs: hints, status updates and flushes
+        self.scheduler_catch_up = self.config.get('SCHEDULER_CATCH_UP', "RUN").upper()
+        self.scheduler_max_lateness = float(self.config.get('SCHEDULER_MAX_LATENESS', 3600))
+        self.status_interval = float(self.config.get('STATUS_INTERVAL', 3600))
+        
+        # Replay of messages missed while offline
+        self.catch_up_limit = int(self.config.get('CATCH_UP_LIMIT', 5000))
+        self.catch_up_timeout = float(self.config.get('CATCH_UP_TIMEOUT', 120))
+        self.catch_up_progress = int(self.config.get('CATCH_UP_PROGRESS', 500))
+        
+        # Game 4 features of messages this long are extracted in a worker
+        # process (see services/feature_pool.py); 0 keeps everything inline
+        self.feature_offload_chars = int(self.config.get('FEATURE_OFFLOAD_CHARS', 2048))
+        self.feature_timeout = float(self.config.get('FEATURE_TIMEOUT', 0.5))
+        
+        # Per-chat queues of incoming messages
+        self.dispatch_max_queue = int(self.config.get('DISPATCH_MAX_QUEUE', 1000))
+        self.dispatch_overflow = self.config.get('DISPATCH_OVERFLOW', "DROP_OLDEST").upper()
+        
+        # Outbound message rate limits (messages per second)
+        self.outbox_global_rate = float(self.config.get('OUTBOX_GLOBAL_RATE', 25))
+        self.outbox_global_burst = int(self.config.get('OUTBOX_GLOBAL_BURST', 25))
+        self.outbox_chat_rate = float(self.config.get('OUTBOX_CHAT_RATE', 20 / 60))
+        self.outbox_chat_burst = int(self.config.get('OUTBOX_CHAT_BURST', 3))
+        
+        # Testing mode: play only in PRIVATE_ID and count the bot's own messages
+        self.testing = parse_bool(self.config.get('TESTING', True))
+        
+        # Games, one per chat
+        self.chats = self.load_chats()
+        
+    def load_chats(self, config=None):
+        """Build a GameConfig for every chat the bot should play in
+
+        Top-level game settings describe the chat in TARGET_CHAT_ID. Entries in
+        CHATS add more chats; each entry overrides the top-level settings.
+        `config` is the parsed config.json and defaults to the one loaded at startup.
+        """
+        if config is None:
+            config = self.config
+        if self.testing:
+            return [GameConfig(int(self.private_id), config)]
+        
+        chats = []
+        if self.target_chat_id:
+            chats.append(GameConfig(int(self.target_chat_id), config))
+        for chat in config.get('CHATS', []):
+            chat_id = int(chat['CHAT_ID'])
+            settings = {key: value for key, value in config.items()
+                        if key not in ('CHATS', 'MESSAGE_COUNT_FILE')}
+            settings['MESSAGE_COUNT_FILE'] = f"message_count_{chat_id}.txt"
+            settings.update(chat)
+            chats.append(GameConfig(chat_id, settings))
+        return chats
+
+
+class GameConfig:
+    """Game settings for a single chat"""
+    
+    def __init__(self, chat_id, settings):
+        self.chat_id = chat_id
+        
         # Game settings
-        self.game = int(self.config.get('GAME', 0))
-        self.message = self.config.get('MESSAGE', "Trigger found!")
-        self.count_user = self.config.get('COUNT_USER', "FALSE").upper()
+        self.game = int(settings.get('GAME', 0))
+        self.message = settings.get('MESSAGE', "Trigger found!")
+        self.count_user = settings.get('COUNT_USER', "FALSE").upper()
+        self.dedup_window = int(settings.get('DEDUP_WINDOW', 2048))
+        self.edit_rule = settings.get('EDIT_RULE', "IGNORE").upper()
+        self.message_count_file = settings.get('MESSAGE_COUNT_FILE', 'message_count.txt')
         
         # Ignored users
-        self.ignored_users = self.config.get('IGNORED_USERS', "").split(",")
+        self.ignored_users = settings.get('IGNORED_USERS', "").split(",")
         
         # Game 1 or 3 config
-        self.trigger_type = self.config.get('TRIGGER_TYPE')
-        self.trigger_word = self.config.get('TRIGGER_WORD')
-        self.trigger_id = int(self.config.get('TRIGGER_ID', 0))
-        self.match_type = self.config.get('MATCH_TYPE')
-        self.hints = self.config.get('HINTS')
+        self.trigger_type = settings.get('TRIGGER_TYPE')
+        self.trigger_word = settings.get('TRIGGER_WORD')
+        self.trigger_id = int(settings.get('TRIGGER_ID', 0))
+        self.match_type = settings.get('MATCH_TYPE')
+        self.match_lookalikes = parse_bool(settings.get('MATCH_LOOKALIKES', True))
+        self.trigger_words = self.load_trigger_words(settings)
+        if self.trigger_word is None and self.trigger_words:
+            self.trigger_word = ", ".join(word for word, _ in self.trigger_words)
+        self.hints = settings.get('HINTS')
         
         # Game 2 config
-        self.min_num = int(self.config.get('MINIMUM', 0))
-        self.max_num = int(self.config.get('MAXIMUM', 0))
+        self.min_num = int(settings.get('MINIMUM', 0))
+        self.max_num = int(settings.get('MAXIMUM', 0))
+        self.near_miss_range = int(settings.get('NEAR_MISS_RANGE', 3))
         
         # Game 3 config
-        self.buffer = int(self.config.get('BUFFER', 0))
+        self.buffer = int(settings.get('BUFFER', 0))
         
         # Game 4 config
-        self.trigger_condition = self.config.get('TRIGGER_CONDITION')
-        self.trigger_condition_value = int(self.config.get('TRIGGER_CONDITION_VALUE', 0))
+        self.trigger_condition = settings.get('TRIGGER_CONDITION')
+        self.trigger_condition_value = int(settings.get('TRIGGER_CONDITION_VALUE', 0))
+        self.scoring_method = settings.get('SCORING_METHOD', "MEAN").upper()
+        self.scoring_top_k = int(settings.get('SCORING_TOP_K', 3))
+        self.answer_threshold = self.optional_float(settings.get('ANSWER_THRESHOLD'))
+        self.wrong_threshold = self.optional_float(settings.get('WRONG_THRESHOLD'))
+        self.answer_cascade = parse_bool(settings.get('ANSWER_CASCADE', True))
+        self.cascade_near_ratio = float(settings.get('CASCADE_NEAR_RATIO', 0.9))
+        self.cascade_reject_overlap = float(settings.get('CASCADE_REJECT_OVERLAP', 0.6))
+        self.cascade_reject_margin = float(settings.get('CASCADE_REJECT_MARGIN', 0.3))
+        
+    def errors(self):
+        """Return the problems that make these settings unplayable"""
+        errors = []
+        if self.game not in (1, 2, 3, 4):
+            errors.append(f"invalid GAME {self.game}")
+        if self.game in (1, 3):
+            if self.trigger_type not in ("WORD", "STICKER"):
+                errors.append(f"invalid TRIGGER_TYPE {self.trigger_type}")
+            elif self.trigger_type == "WORD" and not self.trigger_words:
+                errors.append("no TRIGGER_WORD or TRIGGER_WORDS")
+        if self.game == 2 and self.min_num > self.max_num:
+            errors.append("MINIMUM is larger than MAXIMUM")
+        if self.game == 3 and self.buffer <= 0:
+            errors.append("BUFFER must be positive")
+        if self.game == 4 and self.scoring_method not in ("MEAN", "MAX", "TOPK"):
+            errors.append(f"invalid SCORING_METHOD {self.scoring_method}")
+        if self.edit_rule not in ("IGNORE", "REEVALUATE"):
+            errors.append(f"invalid EDIT_RULE {self.edit_rule}")
+        if self.hints is not None and not isinstance(self.hints, dict):
+            errors.append("HINTS must be an object")
+        return errors
+        
+    @staticmethod
+    def optional_float(value):
+        return float(value) if value is not None else None
+        
+    def load_trigger_words(self, settings):
+        """Return (word, match type) pairs from TRIGGER_WORDS, falling back to TRIGGER_WORD
+
+        TRIGGER_WORDS entries are either plain strings, which use MATCH_TYPE,
+        or objects with their own WORD and MATCH_TYPE.
+        """
+        entries = settings.get('TRIGGER_WORDS')
+        if entries is None:
+            return [(self.trigger_word, self.match_type)] if self.trigger_word else []
         
-        # Testing mode
-        self.testing = True
\ No newline at end of file
+        trigger_words = []
+        for entry in entries:
+            if isinstance(entry, dict):
+                trigger_words.append((entry['WORD'], entry.get('MATCH_TYPE', self.match_type)))
+            else:
+                trigger_words.append((entry, self.match_type))
+        return trigger_words
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import os
+
+
+class ConfigReloader:
+    """Applies changes to config.json to the running games without a restart
+
+    run() polls the file's mtime and size. When they change, the file is
+    parsed and every chat's new GameConfig is validated and its matchers
+    built in a worker thread; if every chat passes, all sessions switch to
+    their new config together in one step on the event loop. Anything
+    invalid rejects the whole reload and the running config stays in place.
+
+    GAME and Game 4's TRIGGER_CONDITION cannot change while a game runs, and
+    chats cannot be added or removed. Settings outside the game (logging,
+    outbox, embeddings) are only read at startup.
+    """
+
+    def __init__(self, config, sessions, logger, on_hints_changed, path='config.json', interval=2.0):
+        self.config = config
+        self.sessions = sessions
+        self.logger = logger
+        self.on_hints_changed = on_hints_changed
+        self.path = path
+        self.interval = interval
+        self.reloads = 0
+        self.rejected = 0
+        self._signature = self.signature()
+
+    def signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    async def run(self):
+        """Poll for changes until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval)
+            signature = self.signature()
+            if signature is not None and signature != self._signature:
+                self._signature = signature
+                await self.reload()
+
+    async def reload(self):
+        """Validate the file off the event loop, then swap every session's config at once"""
+        loop = asyncio.get_running_loop()
+        try:
+            plan = await loop.run_in_executor(None, self.prepare)
+        except Exception as e:
+            self.rejected += 1
+            self.logger.error(f"Config reload rejected, keeping the running config: {e}")
+            return
+
+        hints_changed = []
+        for session, game_config, prepared in plan:
+            if game_config.hints != session.config.hints:
+                hints_changed.append(session)
+            session.controller.apply_config(game_config, prepared)
+            if game_config.dedup_window != session.config.dedup_window:
+                session.seen.resize(game_config.dedup_window)
+            session.config = game_config
+        self.reloads += 1
+        self.logger.info(f"Config reloaded for {len(plan)} chats.")
+
+        for session in hints_changed:
+            self.on_hints_changed(session)
+
+    def prepare(self):
+        """Parse and validate config.json; returns (session, GameConfig, prepared) per chat"""
+        with open(self.path, 'r') as f:
+            settings = json.load(f)
+        chats = {game_config.chat_id: game_config for game_config in self.config.load_chats(settings)}
+
+        plan = []
+        for session in self.sessions:
+            game_config = chats.pop(session.chat_id, None)
+            if game_config is None:
+                self.logger.warning(f"Chat {session.chat_id} was removed from the config; restart to stop its game.")
+                continue
+            errors = game_config.errors()
+            if game_config.game != session.config.game:
+                errors.append("GAME cannot change while a game is running")
+            elif game_config.game == 4 and game_config.trigger_condition != session.config.trigger_condition:
+                errors.append("TRIGGER_CONDITION cannot change while a game is running")
+            if errors:
+                raise ValueError(f"chat {session.chat_id}: {'; '.join(errors)}")
+            plan.append((session, game_config, session.controller.prepare_config(game_config)))
+
+        for chat_id in chats:
+            self.logger.warning(f"Chat {chat_id} was added to the config; restart to start its game.")
+        return plan
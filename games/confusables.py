@@ -0,0 +1,87 @@
+import functools
+import json
+import time
+import unicodedata
+
+
+# Blocks holding the combining marks NFKD splits off accented letters
+COMBINING_BLOCKS = ((0x0300, 0x036F), (0x1AB0, 0x1AFF), (0x1DC0, 0x1DFF), (0x20D0, 0x20FF), (0xFE20, 0xFE2F))
+
+
+class Skeleton:
+    """Maps lookalike text to the plain characters it imitates
+
+    NFKD first folds compatibility forms (fullwidth, mathematical and
+    circled letters, ligatures) and splits accents off their letters. One
+    str.translate pass then replaces letters borrowed from other scripts
+    with the ASCII letter they look like, and deletes combining marks and
+    invisible characters, so "һеllо", "ｈｅｌｌｏ" and "he\\u200bllo" all
+    become "hello". Case is kept, so matching rules that care about case
+    still apply. ASCII text is returned as is.
+    """
+
+    def __init__(self, lookalikes, invisible, alias_map):
+        table = {}
+        for start, end in COMBINING_BLOCKS:
+            for code in range(start, end + 1):
+                if unicodedata.category(chr(code)) == 'Mn':
+                    table[code] = None
+        for char in invisible:
+            table[ord(char)] = None
+        for char, plain in lookalikes.items():
+            table[ord(char)] = plain
+        # alias_map entries NFKD already folds would never be seen by the table
+        for alias, base in alias_map.items():
+            if len(alias) == 1 and unicodedata.normalize('NFKD', alias) == alias:
+                table.setdefault(ord(alias), base)
+        self.table = table
+
+    def __call__(self, text):
+        if text.isascii():
+            return text
+        return unicodedata.normalize('NFKD', text).translate(self.table)
+
+
+@functools.lru_cache(maxsize=None)
+def load_skeleton(path="confusables.json", char_list_path="char_list.json"):
+    """Build the Skeleton from the bundled table and char_list.json's alias_map, once per process"""
+    with open(path, "r", encoding="utf-8") as file:
+        confusables = json.load(file)
+    with open(char_list_path, "r") as file:
+        alias_map = json.load(file)["alias_map"]
+    return Skeleton(confusables["lookalikes"], confusables["invisible"], alias_map)
+
+
+def skeleton(text):
+    """Return the skeleton of a text using the bundled table"""
+    return load_skeleton()(text)
+
+
+def benchmark_overhead(skeleton, samples, repeats=2000):
+    """Return (name, length, seconds per message) for each sample text"""
+    rows = []
+    for name, text in samples:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            skeleton(text)
+        rows.append((name, len(text), (time.perf_counter() - started) / repeats))
+    return rows
+
+
+if __name__ == "__main__":
+    fold = load_skeleton()
+    plain = "see you at supper later, who is paying this time? "
+    disguised = "ѕее уоս аt ѕսррег lаtег, ԝһо іѕ рауіпց tһіѕ tіmе? "
+    accented = "séé yöú àt süppér låtèr, whó ïs pâyîng thïs tímé? "
+    samples = [
+        ("ascii", plain),
+        ("ascii, long", plain * 80),
+        ("lookalikes", disguised),
+        ("lookalikes, long", disguised * 80),
+        ("accents", accented),
+        ("accents, long", accented * 80),
+    ]
+    for name, length, seconds in benchmark_overhead(fold, samples):
+        print(f"{name:>17}: {length:>5} chars, {seconds * 1e6:7.2f}us per message, "
+              f"{seconds * 1e9 / length:6.1f}ns per char")
+    print(f"{fold(disguised)!r}")
@@ -1,66 +1,95 @@
+import asyncio
 import json
-import re
-import unicodedata
 
-import numpy as np
+from games.confusables import load_skeleton
+from games.features import FeatureExtractor
+from games.matcher import TriggerMatcher
+from services.answer_cascade import AnswerCascade
 
 
 class GameController:
-    """Controls game logic for different game types"""
+    """Controls game logic for different game types
+
+    Every check takes a MessageView, so the forms of a message's text that
+    several checks need are only computed once.
+    """
     
-    def __init__(self, config, embedding_service, counter, logger):
+    def __init__(self, config, embedding_service, counter, logger, feature_pool=None):
         self.config = config
         self.embedding_service = embedding_service
+        self.feature_pool = feature_pool
         self.counter = counter
         self.logger = logger
         self.loser = ""
         with open("char_list.json", "r") as file:
             self.char_list = json.load(file)
-        self.one_dot_list = self.char_list["one_dot_list"]
-        self.two_dots_list = self.char_list["two_dots_list"]
-        self.three_dots_list = self.char_list["three_dots_list"]
-        self.loop_map = self.char_list["loop_map"]
-        self.alias_map = self.char_list["alias_map"]
+        self.feature_extractor = FeatureExtractor(self.char_list)
+        self.skeleton = load_skeleton()
+        self.trigger_matcher = self.build_matcher(config)
+        for word, match_type in self.trigger_matcher.invalid:
+            self.logger.error(f"Invalid MATCH_TYPE {match_type} specified for trigger {word}.")
+        self.answer_cascade = self.build_cascade(config)
+        
+    # Settings each derived structure is built from
+    MATCHER_FIELDS = ("trigger_words", "match_lookalikes")
+    CASCADE_FIELDS = ("answer_cascade", "cascade_near_ratio", "cascade_reject_overlap", "cascade_reject_margin")
+        
+    def build_matcher(self, config):
+        """Build the trigger word matcher, on skeletons if lookalikes should match"""
+        return TriggerMatcher(config.trigger_words, self.skeleton if config.match_lookalikes else None)
+        
+    def build_cascade(self, config):
+        """Build the Game 4 lexical pre-filter, or None if disabled or not playing Game 4"""
+        if self.embedding_service is None or not config.answer_cascade:
+            return None
+        return AnswerCascade(
+            self.embedding_service.correct_references,
+            self.embedding_service.wrong_references,
+            near_ratio=config.cascade_near_ratio,
+            reject_overlap=config.cascade_reject_overlap,
+            reject_margin=config.cascade_reject_margin,
+        )
+        
+    def prepare_config(self, config):
+        """Build what a new config needs, reusing structures whose settings did not change
+
+        Pure and safe to run off the event loop. Raises ValueError for invalid triggers.
+        """
+        matcher = self.trigger_matcher
+        if any(getattr(config, field) != getattr(self.config, field) for field in self.MATCHER_FIELDS):
+            matcher = self.build_matcher(config)
+            if matcher.invalid:
+                raise ValueError(", ".join(f"invalid MATCH_TYPE {match_type} for trigger {word}"
+                                            for word, match_type in matcher.invalid))
+        cascade = self.answer_cascade
+        if any(getattr(config, field) != getattr(self.config, field) for field in self.CASCADE_FIELDS):
+            cascade = self.build_cascade(config)
+        return matcher, cascade
+        
+    def apply_config(self, config, prepared):
+        """Switch to a new config and the structures prepare_config built for it"""
+        self.trigger_matcher, self.answer_cascade = prepared
+        self.config = config
         
-    async def check_trigger(self, event):
+    async def check_trigger(self, view):
         """Game 1: Check for a specific word or sticker in the message"""
         if self.config.trigger_type == "WORD":
-            return await self._check_word(event)
+            return await self._check_word(view)
         elif self.config.trigger_type == "STICKER":
-            return await self._check_sticker(event)
+            return await self._check_sticker(view)
         else:
             self.logger.error("Invalid TRIGGER_TYPE specified.")
             return False
     
-    async def _check_word(self, event):
-        """Check if message contains the trigger word"""
-        text = event.raw_text or ""
-        lower_text = text.lower()
-        lower_trigger = self.config.trigger_word.lower()
-        escaped_trigger = re.escape(self.config.trigger_word)
-        pattern = r'\b' + escaped_trigger + r'\b'
-    
-        match = False
+    async def _check_word(self, view):
+        """Check if message contains any trigger word"""
+        if self.config.match_lookalikes:
+            return self.trigger_matcher.matches(view.skeleton, view.skeleton_lower)
+        return self.trigger_matcher.matches(view.text, view.lower)
     
-        if self.config.match_type == "EXACT":
-            match = text == self.config.trigger_word
-        elif self.config.match_type == "EXACT IGNORE PUNCTUATION":
-            match = bool(re.search(pattern, text))
-        elif self.config.match_type == "EXACT IGNORE CASE":
-            match = lower_text == lower_trigger
-        elif self.config.match_type == "EXACT IGNORE CASE AND PUNCTUATION":
-            match = bool(re.search(pattern, lower_text))
-        elif self.config.match_type == "CONTAINS":
-            match = bool(re.search(escaped_trigger, text, re.IGNORECASE))
-    
-        return match
-    
-    async def _check_sticker(self, event):
+    async def _check_sticker(self, view):
         """Check if message contains the trigger sticker"""
-        if event.media and hasattr(event.media, 'document'):
-            if event.media.document.id == self.config.trigger_id:
-                return True
-        return False
+        return view.media_id is not None and view.media_id == self.config.trigger_id
         
     async def check_target_count(self):
         """Game 2: Check if message is the nth message"""
@@ -68,9 +97,9 @@ class GameController:
             return True
         return False
     
-    async def check_buffer(self, event):
+    async def check_buffer(self, view):
         """Game 3: Check if the word hasn't been said in too long"""
-        if not await self.check_trigger(event):
+        if not await self.check_trigger(view):
             self.counter.last_trigger += 1
             if self.counter.last_trigger >= self.config.buffer:
                 self.counter.last_trigger = 0
@@ -79,162 +108,113 @@ class GameController:
             self.counter.last_trigger = 0
         return False
       
-    async def check_correct_answer(self, event, threshold=0.88):
+    def is_answer(self, view):
+        """Game 4: Check if message is a guess, i.e. starts with 'answer'"""
+        return view.lower.lstrip('"').startswith('answer')
+      
+    async def check_correct_answer(self, view, threshold=None):
         """Game 4: Check if message is a correct answer"""
-        text = event.raw_text or ""
-        if not text.lower().lstrip('"').rstrip('"').startswith('answer'):
-            self.logger.info("Message does not start with 'answer'.")
+        text = view.text
+        if not self.is_answer(view):
+            self.logger.debug("Message does not start with 'answer'.")
             return False
         
+        # Settle obvious guesses lexically before paying for an embedding
+        if self.answer_cascade is not None:
+            verdict, stage = self.answer_cascade.classify(text, view.guess)
+            if verdict is not None:
+                self.logger.info(f"Answer settled by cascade ({stage}): {verdict}")
+                return verdict
         
-        
-        message_embedding = self.embedding_service.get_embedding(text)
-        similarities = []
-        wrong_similarities = []
-        
-        for ref_embedding in self.embedding_service.reference_embedding:
-            similarity = np.dot(ref_embedding, message_embedding) / (
-                np.linalg.norm(ref_embedding) * np.linalg.norm(message_embedding)
-            )
-            similarities.append(similarity)
-        
-        for ref_wrong_embedding in self.embedding_service.reference_wrong_embedding:
-            wrong_similarity = np.dot(ref_wrong_embedding, message_embedding) / (
-                np.linalg.norm(ref_wrong_embedding) * np.linalg.norm(message_embedding)
+        try:
+            similarity, wrong_similarity = await self.embedding_service.score_answer(
+                text, self.config.scoring_method, self.config.scoring_top_k, view.guess
             )
-            wrong_similarities.append(wrong_similarity)
-        
-        average_similarity = np.mean(similarities)
-        average_wrong_similarity = np.mean(wrong_similarities)
-        self.logger.info(f"Average similarity: {average_similarity}")
-        self.logger.info(f"Average wrong similarity: {average_wrong_similarity}")
-        
-        close_enough = average_similarity >= threshold and average_wrong_similarity < 0.8
+        except asyncio.TimeoutError:
+            self.logger.error(f"Timed out getting embedding for answer: {text}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Error getting embedding for answer: {e}")
+            return False
+        self.logger.info(f"Similarity ({self.config.scoring_method}): {similarity}")
+        self.logger.info(f"Wrong similarity ({self.config.scoring_method}): {wrong_similarity}")
+        
+        backend = self.embedding_service.backend
+        if threshold is None:
+            threshold = self.config.answer_threshold
+        if threshold is None:
+            threshold = backend.answer_threshold
+        wrong_threshold = self.config.wrong_threshold
+        if wrong_threshold is None:
+            wrong_threshold = backend.wrong_threshold
+        close_enough = similarity >= threshold and wrong_similarity < wrong_threshold
         self.logger.info(f"Close enough: {close_enough}")
         
         return close_enough
         
-    async def check_trigger_condition(self, event):
+    # Game 4 conditions that trigger on an exact count of a message feature
+    COUNT_CONDITIONS = {
+        "DOTS": "dots",
+        "SPACES": "spaces",
+        "LETTERS": "letters",
+        "DIGITS": "digits",
+        "WORDS": "words",
+        "LOOPS": "loops",
+    }
+        
+    async def check_trigger_condition(self, view):
         """Game 4: Check if message matches trigger condition"""
-        self.logger.info(f"Condition: {self.config.trigger_condition}")
-        
-        if self.config.trigger_condition == "DOTS":
-            return await self.check_dot_count(event, self.config.trigger_condition_value)
-        elif self.config.trigger_condition == "SPACES":
-            return await self.check_spaces(event, self.config.trigger_condition_value)
-        elif self.config.trigger_condition == "LOOPS":
-            return await self.check_loop_count(event, self.config.trigger_condition_value)
-        elif self.config.trigger_condition == "OIIAI":
-            return await self.check_oiiai(event)
-        elif self.config.trigger_condition == "ALPHABET":
-            return await self.check_alphabetical_order(event)
+        condition = self.config.trigger_condition
+        self.logger.debug(f"Condition: {condition}")
+        features = await self.extract_features(view)
+        if features is None:
+            return False
+        
+        if condition in self.COUNT_CONDITIONS:
+            return self.check_count(features, condition, self.config.trigger_condition_value)
+        elif condition == "OIIAI":
+            return self.check_oiiai(features)
+        elif condition == "ALPHABET":
+            return self.check_alphabetical_order(features)
         else:
             self.logger.error("Invalid TRIGGER_CONDITION specified.")
             return False
         
-    async def check_dot_count(self, event, count=5):
-        text = event.raw_text if event.raw_text else None
-        text.unicodedata.normalize('NFD', text)
-        
-        
-        dot_count = sum(text.count(dot) for dot in self.one_dot_list) + \
-            sum(text.count(dot) * 2 for dot in self.two_dots_list) + \
-            sum(text.count(dot) * 3 for dot in self.three_dots_list)
-            
-        
-        if dot_count == count:
-            self.logger.info(f"Dot count reached: {dot_count}")
-            return True
+    async def extract_features(self, view):
+        """Extract features inline, or in the worker process for very long messages
 
-        return False
-    
-    async def check_spaces(self, event, count=5):
-        text = event.raw_text if event.raw_text else None
-        space_count = text.count(" ")
-        
-        if space_count == count:
-            self.logger.info(f"Space count reached: {space_count}")
-            return True
-
-        return False
-    
-    
-    def normalize_char(self, char):
-        decomposed = unicodedata.normalize('NFD', char)
-        base = ''.join(c for c in decomposed if not unicodedata.combining(c))
-        return self.alias_map.get(base, base)
-    
-    async def check_loop_count(self, event, count=5):
-        text = event.raw_text if event.raw_text else None
-        text = unicodedata.normalize('NFD', text)
-        loop_count = 0
-        
-        for char in text:
-            if unicodedata.combining(char):
-                continue
-                
-            base_char = self.normalize_char(char)
-            loops = self.loop_map.get(base_char, 0)
-            loop_count += loops
-            
-        self.logger.info(f"Loop count reached: {loop_count}")
-        return loop_count == count
-    
-
-    async def check_letter_count(self, event, count=5):
-        text = event.raw_text if event.raw_text else None
-        letter_count = sum(1 for char in text if char.isalpha())
-        
-        if letter_count == count:
-            self.logger.info(f"Letter count reached: {letter_count}")
-            return True
-
-        return False
-    
-    async def check_digit_count(self, event, count=5):
-        text = event.raw_text if event.raw_text else None
-        digit_count = sum(1 for char in text if char.isdigit())
-        
-        if digit_count == count:
-            self.logger.info(f"Digit count reached: {digit_count}")
-            return True
-
-        return False
-    
-    async def check_word_count(self, event, count=5):
-        text = event.raw_text if event.raw_text else None
-        word_count = len(text.split())
-        
-        if word_count == count:
-            self.logger.info(f"Word count reached: {word_count}")
+        Returns None if the worker runs out of time, so the message does not trigger.
+        """
+        if self.feature_pool is not None and len(view.text) >= self.feature_pool.cutoff:
+            return await self.feature_pool.extract(view.text)
+        return self.feature_extractor.extract(view)
+        
+    def check_count(self, features, condition, count=5):
+        """Check if a counted feature (dots, spaces, loops, ...) equals the target"""
+        value = getattr(features, self.COUNT_CONDITIONS[condition])
+        self.logger.debug(f"{condition} count: {value}")
+        if value == count:
+            self.logger.info(f"{condition} count reached: {value}")
             return True
-
         return False
     
-    async def check_alphabetical_order(self, event, count=5):
-        text = event.raw_text if event.raw_text else None
-        word_count = len(text.split())
-        self.logger.info(f"Word count: {word_count}")
-        self.logger.info(f"text: {text}")
-        if word_count >= count:
-            words = re.sub(r'[^a-zA-Z\s]', '', text).split()
-            first_letters = [word[0].lower() for word in words if word]
+    def check_alphabetical_order(self, features, count=5):
+        """Check if the first letters of at least `count` words are strictly alphabetical"""
+        self.logger.debug(f"Word count: {features.words}")
+        if features.words >= count:
+            first_letters = features.first_letters
             if first_letters == sorted(first_letters) and len(set(first_letters)) == len(first_letters):
                 self.logger.info("First letters are in alphabetical order and are not the same.")
                 return True
 
-            self.logger.info("First letters are not in alphabetical order.")
+            self.logger.debug("First letters are not in alphabetical order.")
         return False
     
-    
-    async def check_oiiai(self, event):
-        text = event.raw_text if event.raw_text else ""
-        vowels = "aeiou"
-        text_vowels = ''.join([char for char in text.lower() if char in vowels])
-        
-        if "oiiai" not in text.lower() and "oiiai" == text_vowels:
+    def check_oiiai(self, features):
+        """Check if the vowels spell 'oiiai' without the message containing it"""
+        if "oiiai" not in features.lower_text and "oiiai" == features.vowels:
             self.logger.info("Message does not contain 'oiiai', but vowels form 'oiiai'.")
             return True
 
-        self.logger.info("Condition not met for 'oiiai'.")
-        return False
\ No newline at end of file
+        self.logger.debug("Condition not met for 'oiiai'.")
+        return False
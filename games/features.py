@@ -0,0 +1,106 @@
+import re
+import unicodedata
+from collections import Counter
+
+
+VOWELS = "aeiou"
+
+
+class MessageFeatures:
+    """Every Game 4 feature of one message"""
+
+    __slots__ = ('dots', 'spaces', 'letters', 'digits', 'words', 'loops',
+                 'vowels', 'first_letters', 'lower_text')
+
+    def __init__(self, dots, spaces, letters, digits, words, loops, vowels, first_letters, lower_text):
+        self.dots = dots
+        self.spaces = spaces
+        self.letters = letters
+        self.digits = digits
+        self.words = words
+        self.loops = loops
+        self.vowels = vowels
+        self.first_letters = first_letters
+        self.lower_text = lower_text
+
+
+class FeatureExtractor:
+    """Computes all Game 4 features of a message from tables compiled once from char_list.json
+
+    The message's NFD form is reduced to a character histogram in a
+    single C-level pass. Counts are then summed over the distinct characters
+    only, using per-character weight tables, so the cost no longer grows with
+    the number of entries in char_list.json. The vowel and first-letter
+    sequences come from two precompiled regexes.
+    """
+
+    FIRST_LETTER = re.compile(r'(?<!\S)[^a-zA-Z\s]*([a-zA-Z])')
+    NOT_VOWEL = re.compile(f'[^{VOWELS}]+')
+
+    def __init__(self, char_list):
+        self.dot_weights = self._build_dot_weights(char_list)
+        self.loop_weights = self._build_loop_weights(char_list["loop_map"], char_list["alias_map"])
+        self._char_weights = {}
+
+    @staticmethod
+    def _build_dot_weights(char_list):
+        weights = {}
+        for key, weight in (("one_dot_list", 1), ("two_dots_list", 2), ("three_dots_list", 3)):
+            for char in char_list[key]:
+                # Precomposed entries such as "ẅ" decompose to a base letter plus a
+                # combining dot mark, which carries the weight after NFD
+                decomposed = unicodedata.normalize('NFD', char)
+                if len(decomposed) == 1:
+                    weights[decomposed] = weight
+        return weights
+
+    @staticmethod
+    def _build_loop_weights(loop_map, alias_map):
+        weights = {char: loops for char, loops in loop_map.items() if loops}
+        for alias, base in alias_map.items():
+            loops = loop_map.get(base, 0)
+            if loops:
+                weights[alias] = loops
+        return weights
+
+    def _weights(self, char):
+        """Return (dots, loops, is_letter, is_digit) for a character, memoized"""
+        weights = self._char_weights.get(char)
+        if weights is None:
+            combining = unicodedata.combining(char)
+            weights = (
+                self.dot_weights.get(char, 0),
+                0 if combining else self.loop_weights.get(char, 0),
+                char.isalpha(),
+                char.isdigit(),
+            )
+            self._char_weights[char] = weights
+        return weights
+
+    def extract(self, view):
+        """Return the MessageFeatures of a MessageView"""
+        text = view.text
+        decomposed = view.nfd
+
+        dots = loops = letters = digits = 0
+        for char, count in Counter(decomposed).items():
+            char_dots, char_loops, is_letter, is_digit = self._weights(char)
+            dots += char_dots * count
+            loops += char_loops * count
+            letters += is_letter * count
+            digits += is_digit * count
+
+        # Sequences are read from the original text so that accented letters
+        # do not count as their base vowel or initial
+        lower_text = view.lower
+        return MessageFeatures(
+            dots=dots,
+            spaces=decomposed.count(" "),
+            letters=letters,
+            digits=digits,
+            words=len(view.tokens),
+            loops=loops,
+            vowels=self.NOT_VOWEL.sub('', lower_text),
+            first_letters=[letter.lower() for letter in self.FIRST_LETTER.findall(text)],
+            lower_text=lower_text,
+        )
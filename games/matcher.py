@@ -0,0 +1,98 @@
+import re
+
+
+def trie_pattern(words):
+    """Build a regex alternation shaped like a trie over words
+
+    Shared prefixes are factored out, so the regex engine only follows the
+    branch matching the next character and the cost of a search depends on
+    the text length rather than the number of words. Longer words are tried
+    before their prefixes.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[None] = True
+
+    def build(node):
+        is_end = None in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(
+            (item for item in node.items() if item[0] is not None), key=lambda item: item[0]
+        )]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if is_end else group
+
+    return build(trie)
+
+
+class TriggerMatcher:
+    """Matches a message against many trigger words at once
+
+    Triggers are grouped by MATCH_TYPE and compiled once: exact types become
+    dict lookups, the others one trie-shaped regex each, so every message is
+    scanned at most three times however many triggers there are. With a
+    `normalize` function (such as a Skeleton) the triggers are normalized
+    with it, and messages should be passed through it too.
+    """
+
+    def __init__(self, triggers, normalize=None):
+        self.exact = {}
+        self.exact_ignore_case = {}
+        self.boundary = {}
+        self.boundary_ignore_case = {}
+        self.contains = {}
+        self.invalid = []
+
+        for word, match_type in triggers:
+            if not word:
+                continue
+            if normalize is not None:
+                word = normalize(word)
+            if match_type == "EXACT":
+                self.exact[word] = word
+            elif match_type == "EXACT IGNORE CASE":
+                self.exact_ignore_case[word.lower()] = word
+            elif match_type == "EXACT IGNORE PUNCTUATION":
+                self.boundary[word] = word
+            elif match_type == "EXACT IGNORE CASE AND PUNCTUATION":
+                self.boundary_ignore_case[word.lower()] = word
+            elif match_type == "CONTAINS":
+                self.contains[word.lower()] = word
+            else:
+                self.invalid.append((word, match_type))
+
+        self.boundary_pattern = self._compile(self.boundary, r'\b(?:{})\b')
+        self.boundary_ignore_case_pattern = self._compile(self.boundary_ignore_case, r'\b(?:{})\b')
+        self.contains_pattern = self._compile(self.contains, '{}', re.IGNORECASE)
+
+    @staticmethod
+    def _compile(words, template, flags=0):
+        if not words:
+            return None
+        return re.compile(template.format(trie_pattern(words)), flags)
+
+    def __len__(self):
+        return (len(self.exact) + len(self.exact_ignore_case) + len(self.boundary)
+                + len(self.boundary_ignore_case) + len(self.contains))
+
+    def matches(self, text, lower_text=None):
+        """Return True if any trigger matches the message; pass its lowercased text if already known"""
+        if text in self.exact:
+            return True
+        if lower_text is None:
+            lower_text = text.lower()
+        if lower_text in self.exact_ignore_case:
+            return True
+        if self.boundary_pattern and self.boundary_pattern.search(text):
+            return True
+        if self.boundary_ignore_case_pattern and self.boundary_ignore_case_pattern.search(lower_text):
+            return True
+        if self.contains_pattern and self.contains_pattern.search(text):
+            return True
+        return False
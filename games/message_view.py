@@ -0,0 +1,87 @@
+import unicodedata
+
+from games.confusables import skeleton
+from services.answer_cascade import normalize_guess
+
+
+_UNSET = object()
+
+
+class MessageView:
+    """One message as the game checks see it
+
+    Built once per message and passed to every GameController check. Derived
+    forms of the text are computed the first time a check asks for them and
+    kept, so a message that goes through several checks (Game 3's buffer,
+    Game 4's answer and trigger condition) lowercases, normalizes and splits
+    its text at most once.
+    """
+
+    __slots__ = ('event', 'text', '_lower', '_nfd', '_tokens', '_guess', '_skeleton', '_skeleton_lower', '_media_id')
+
+    def __init__(self, text, event=None):
+        self.event = event
+        self.text = text or ""
+        self._lower = None
+        self._nfd = None
+        self._tokens = None
+        self._guess = None
+        self._skeleton = None
+        self._skeleton_lower = None
+        self._media_id = _UNSET
+
+    @classmethod
+    def of(cls, event):
+        """Wrap a Telethon event or message"""
+        return cls(event.raw_text, event)
+
+    @property
+    def lower(self):
+        """The text lowercased, as trigger words and the Game 4 checks compare it"""
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    @property
+    def nfd(self):
+        """The text in NFD form, with accents split off their base letters"""
+        if self._nfd is None:
+            self._nfd = unicodedata.normalize('NFD', self.text)
+        return self._nfd
+
+    @property
+    def tokens(self):
+        """The whitespace-separated words of the text"""
+        if self._tokens is None:
+            self._tokens = self.text.split()
+        return self._tokens
+
+    @property
+    def guess(self):
+        """The text case-folded without punctuation or a leading 'answer', as guesses are compared"""
+        if self._guess is None:
+            self._guess = normalize_guess(self.text)
+        return self._guess
+
+    @property
+    def skeleton(self):
+        """The text with lookalike characters replaced by the letters they imitate"""
+        if self._skeleton is None:
+            self._skeleton = skeleton(self.text)
+        return self._skeleton
+
+    @property
+    def skeleton_lower(self):
+        """The skeleton lowercased"""
+        if self._skeleton_lower is None:
+            self._skeleton_lower = self.skeleton.lower()
+        return self._skeleton_lower
+
+    @property
+    def media_id(self):
+        """The id of the message's document (sticker, GIF, file), or None"""
+        if self._media_id is _UNSET:
+            media = getattr(self.event, 'media', None)
+            document = getattr(media, 'document', None)
+            self._media_id = getattr(document, 'id', None)
+        return self._media_id
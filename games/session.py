@@ -0,0 +1,50 @@
+from bot.seen_window import SeenWindow
+
+
+class GameSession:
+    """One running game: the chat it belongs to and its own config, counter and controller"""
+    
+    def __init__(self, config, counter, controller):
+        self.chat_id = config.chat_id
+        self.config = config
+        self.counter = counter
+        self.controller = controller
+        self.active = True
+        self.last_message_id = 0
+        self.seen = SeenWindow(config.dedup_window)
+        # While messages missed during downtime are replayed, live ones wait here
+        self.replaying = False
+
+
+class SessionRegistry:
+    """Routing table from chat id to the game session running in that chat"""
+    
+    def __init__(self):
+        self._sessions = {}
+        
+    def add(self, session):
+        """Register a session for its chat"""
+        self._sessions[session.chat_id] = session
+        
+    def get(self, chat_id):
+        """Return the active session for a chat, or None"""
+        session = self._sessions.get(chat_id)
+        if session is None or not session.active:
+            return None
+        return session
+    
+    def stop(self, chat_id):
+        """Mark a chat's game as finished so its messages are no longer routed"""
+        session = self._sessions.get(chat_id)
+        if session is not None:
+            session.active = False
+            
+    def active(self):
+        """Return all sessions that are still running"""
+        return [session for session in self._sessions.values() if session.active]
+    
+    def __iter__(self):
+        return iter(self._sessions.values())
+    
+    def __len__(self):
+        return len(self._sessions)
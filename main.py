@@ -1,8 +1,15 @@
 from config.config import Config
 from games.controller import GameController
+from games.session import GameSession, SessionRegistry
 from bot.telegram_bot import TelegramBot
 from services.embedding import EmbeddingService
+from services.embedding_backends import create_backend
 from services.counter import MessageCounter
+from services.entity_cache import EntityCache
+from services.feature_pool import FeaturePool
+from services.state_store import StateStore
+from services.user_stats import UserStats
+from services.scheduler import Scheduler
 from utils.logger import Logger
 
 
@@ -12,20 +19,86 @@ async def main():
     """Main entry point"""
     # Initialize components
     config = Config()
-    logger_instance = Logger()
+    logger_instance = Logger(
+        mode=config.log_mode,
+        level=config.log_level,
+        queue_size=config.log_queue_size,
+        max_bytes=config.log_max_bytes,
+        backup_count=config.log_backup_count,
+        batch_size=config.log_batch_size,
+        debug_sample_rate=config.log_debug_sample_rate,
+    )
     logger = logger_instance.logger
     
-    embedding_service = EmbeddingService(config.openai_key)
-    embedding_service.initialize_embeddings(config.game, config.trigger_condition)
+    # One game per chat; Game 4 chats with the same condition share embeddings
+    state_store = StateStore(config.state_db, logger)
+    sessions = SessionRegistry()
+    embedding_backend = create_backend(config)
+    embedding_services = {}
+    feature_pool = None
+    if config.feature_offload_chars > 0 and any(chat_config.game == 4 for chat_config in config.chats):
+        feature_pool = FeaturePool(logger, config.feature_offload_chars, config.feature_timeout)
+    for chat_config in config.chats:
+        embedding_service = None
+        if chat_config.game == 4:
+            embedding_service = embedding_services.get(chat_config.trigger_condition)
+            if embedding_service is None:
+                embedding_service = EmbeddingService(
+                    embedding_backend,
+                    logger,
+                    config.embedding_cache_dir,
+                    request_timeout=config.embedding_timeout,
+                    max_inflight=config.embedding_max_inflight,
+                    memo_bytes=config.answer_memo_bytes,
+                    memo_ttl=config.answer_memo_ttl,
+                    ann_min_references=config.ann_min_references if config.ann_index else None,
+                    ann_tables=config.ann_tables,
+                    ann_bits=config.ann_bits,
+                )
+                embedding_service.initialize_embeddings(chat_config.game, chat_config.trigger_condition)
+                embedding_services[chat_config.trigger_condition] = embedding_service
+        
+        counter = MessageCounter(
+            chat_config.min_num,
+            chat_config.max_num,
+            logger,
+            chat_config.message_count_file,
+            flush_interval=config.count_flush_interval,
+            flush_events=config.count_flush_events,
+            compact_records=config.count_compact_records,
+        )
+        game_controller = GameController(chat_config, embedding_service, counter, logger, feature_pool)
+        session = GameSession(chat_config, counter, game_controller)
+        state_store.restore(session)
+        sessions.add(session)
     
-    counter = MessageCounter(config.min_num, config.max_num, logger)
-    game_controller = GameController(config, embedding_service, counter, logger)
+    entity_cache = EntityCache(
+        config.entity_cache_size, config.entity_cache_ttl, config.entity_cache_negative_ttl
+    )
     
-    bot = TelegramBot(config, logger, game_controller, counter)
+    user_stats = UserStats(config.state_db, logger)
+    scheduler = Scheduler(
+        config.state_db,
+        logger,
+        catch_up=config.scheduler_catch_up,
+        max_lateness=config.scheduler_max_lateness,
+    )
+    
+    bot = TelegramBot(config, logger, sessions, entity_cache, state_store, user_stats, scheduler, logger_instance)
     
     # Start bot
-    await bot.start()
+    try:
+        await bot.start()
+    finally:
+        for session in sessions:
+            session.counter.close()
+        state_store.close()
+        user_stats.close()
+        scheduler.close()
+        if feature_pool is not None:
+            feature_pool.close()
+        logger_instance.stop()
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
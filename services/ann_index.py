@@ -0,0 +1,135 @@
+import hashlib
+import os
+import time
+
+import numpy as np
+
+
+class LSHIndex:
+    """Random-projection LSH over unit-length rows for approximate cosine search
+
+    Each of `tables` hash tables projects vectors onto `bits` random
+    hyperplanes and buckets rows by the resulting sign pattern. A query
+    collects the rows in its own bucket and, with multi-probe, in every bucket
+    one bit flip away, then ranks only those candidates exactly. Queries that
+    find fewer than k candidates fall back to scanning every row.
+    """
+
+    def __init__(self, matrix, tables=16, bits=12, seed=0, planes=None, codes=None):
+        self.matrix = matrix
+        self.tables = tables
+        self.bits = bits
+        if planes is None:
+            rng = np.random.default_rng(seed)
+            planes = rng.standard_normal((tables, bits, matrix.shape[1])).astype(np.float32)
+        self.planes = planes
+        self.weights = 1 << np.arange(bits, dtype=np.int64)
+        self.probes = np.concatenate(([0], self.weights))
+        self.codes = codes if codes is not None else self.hash(matrix)
+        self.buckets = [self.group(table_codes) for table_codes in self.codes]
+
+    def hash(self, matrix):
+        """Return the bucket code of every row in every table, shaped (tables, rows)"""
+        signs = np.einsum('tbd,nd->tnb', self.planes, matrix) > 0
+        return signs @ self.weights
+
+    @staticmethod
+    def group(codes):
+        """Map each bucket code to the array of rows it holds"""
+        order = np.argsort(codes, kind='stable')
+        unique, starts = np.unique(codes[order], return_index=True)
+        return dict(zip(unique.tolist(), np.split(order, starts[1:])))
+
+    def candidates(self, vector, multiprobe=True):
+        """Return the sorted rows sharing a bucket with the vector in any table"""
+        codes = self.hash(vector[np.newaxis, :])[:, 0]
+        probes = self.probes if multiprobe else self.probes[:1]
+        found = []
+        for buckets, code in zip(self.buckets, codes.tolist()):
+            for probe in probes.tolist():
+                rows = buckets.get(code ^ probe)
+                if rows is not None:
+                    found.append(rows)
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def search(self, vector, k=10, multiprobe=True):
+        """Return (rows, similarities) of the approximate k nearest rows, best first"""
+        rows = self.candidates(vector, multiprobe)
+        if len(rows) < k:
+            rows = np.arange(len(self.matrix))
+        similarities = self.matrix[rows] @ vector
+        if len(rows) > k:
+            top = np.argpartition(similarities, -k)[-k:]
+            rows, similarities = rows[top], similarities[top]
+        order = np.argsort(-similarities)
+        return rows[order], similarities[order]
+
+    def save(self, path, checksum):
+        """Write the hyperplanes and bucket codes atomically, tagged with the matrix checksum"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, planes=self.planes, codes=self.codes, checksum=np.array(checksum))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, matrix, checksum, tables, bits, logger):
+        """Load a saved index for this matrix, or return None if missing or stale"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                planes, codes, saved_checksum = data["planes"], data["codes"], str(data["checksum"])
+        except Exception as e:
+            logger.warning(f"Discarding ANN index {path}: {e}")
+            return None
+        if (saved_checksum != checksum or planes.shape != (tables, bits, matrix.shape[1])
+                or codes.shape != (tables, len(matrix))):
+            return None
+        return cls(matrix, tables, bits, planes=planes, codes=codes)
+
+    @staticmethod
+    def checksum(matrix):
+        return hashlib.sha256(np.ascontiguousarray(matrix).tobytes()).hexdigest()
+
+
+def benchmark_recall(matrix, queries, k=10, tables=16, bits=12, multiprobe=True):
+    """Compare LSH search with exact search: recall@k and time per query"""
+    index = LSHIndex(matrix, tables, bits)
+
+    start = time.perf_counter()
+    exact = [set(np.argpartition(matrix @ query, -k)[-k:].tolist()) for query in queries]
+    exact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    approximate = [set(index.search(query, k, multiprobe)[0].tolist()) for query in queries]
+    ann_time = time.perf_counter() - start
+
+    candidates = [len(index.candidates(query, multiprobe)) for query in queries]
+    found = sum(len(e & a) for e, a in zip(exact, approximate))
+    return {
+        "rows": len(matrix),
+        "recall": found / (k * len(queries)),
+        "mean_candidates": float(np.mean(candidates)),
+        "exact_ms": 1000 * exact_time / len(queries),
+        "ann_ms": 1000 * ann_time / len(queries),
+    }
+
+
+if __name__ == '__main__':
+    # Synthetic clustered references, similar in shape to paraphrased answers
+    rng = np.random.default_rng(1)
+    dim = 1536
+
+    def unit_noise(n, scale):
+        return scale * rng.standard_normal((n, dim)).astype(np.float32) / np.sqrt(dim)
+
+    for rows in (2_000, 20_000, 100_000):
+        centres = unit_noise(rows // 20, 1.0)
+        matrix = centres[rng.integers(0, len(centres), rows)] + unit_noise(rows, 0.7)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        queries = matrix[rng.integers(0, rows, 200)] + unit_noise(200, 0.5)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        print(benchmark_recall(matrix, queries))
@@ -0,0 +1,114 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+
+ANSWER_PREFIX = re.compile(r'^\W*answer\b\W*')
+NON_WORD = re.compile(r'[\W_]+')
+STOPWORDS = frozenset({
+    "a", "an", "the", "is", "it", "its", "of", "in", "on", "to", "and", "or", "my", "your",
+    "i", "you", "think", "guess", "maybe", "message", "messages", "bot", "was", "be", "that",
+})
+
+
+def normalize_guess(text):
+    """Case-fold a guess, drop the leading 'answer' and all punctuation, collapse whitespace"""
+    text = unicodedata.normalize('NFKC', text or "").casefold()
+    text = ANSWER_PREFIX.sub('', text)
+    return NON_WORD.sub(' ', text).strip()
+
+
+def content_tokens(normalized):
+    """Return the set of non-stopword tokens of a normalized guess"""
+    return frozenset(token for token in normalized.split() if token not in STOPWORDS)
+
+
+class AnswerCascade:
+    """Cheap lexical checks that settle obvious Game 4 guesses before any embedding call
+
+    Stages, in order:
+      exact   - the normalized guess equals a normalized reference
+      junk    - nothing left after normalization
+      near    - edit-distance ratio to the closest reference is at least near_ratio
+      overlap - the guess shares far more content words with a wrong reference
+                than with any correct one
+    classify() returns True (accept), False (reject) or None (ask the embeddings).
+    """
+
+    STAGES = ("exact_accept", "exact_reject", "junk_reject", "near_accept", "near_reject",
+              "overlap_reject", "embedding")
+
+    def __init__(self, correct_references, wrong_references, near_ratio=0.9,
+                 reject_overlap=0.6, reject_margin=0.3):
+        self.near_ratio = near_ratio
+        self.reject_overlap = reject_overlap
+        self.reject_margin = reject_margin
+
+        self.correct = {normalize_guess(ref) for ref in correct_references} - {""}
+        self.wrong = {normalize_guess(ref) for ref in wrong_references} - {""} - self.correct
+        self.correct_tokens = [content_tokens(ref) for ref in self.correct]
+        self.wrong_tokens = [content_tokens(ref) for ref in self.wrong]
+        self.counts = dict.fromkeys(self.STAGES, 0)
+
+    def _verdict(self, stage, verdict):
+        self.counts[stage] += 1
+        return verdict, stage
+
+    def classify(self, text, guess=None):
+        """Return (verdict, stage); verdict is None when the guess is ambiguous
+
+        `guess` is normalize_guess(text) when the caller already has it.
+        """
+        if guess is None:
+            guess = normalize_guess(text)
+
+        if guess in self.correct:
+            return self._verdict("exact_accept", True)
+        if guess in self.wrong:
+            return self._verdict("exact_reject", False)
+        if not guess:
+            return self._verdict("junk_reject", False)
+
+        best_correct = self._best_ratio(guess, self.correct)
+        best_wrong = self._best_ratio(guess, self.wrong)
+        if best_correct >= self.near_ratio and best_correct > best_wrong:
+            return self._verdict("near_accept", True)
+        if best_wrong >= self.near_ratio and best_wrong > best_correct:
+            return self._verdict("near_reject", False)
+
+        tokens = content_tokens(guess)
+        if tokens:
+            overlap_correct = self._best_overlap(tokens, self.correct_tokens)
+            overlap_wrong = self._best_overlap(tokens, self.wrong_tokens)
+            if overlap_wrong >= self.reject_overlap and overlap_wrong - overlap_correct >= self.reject_margin:
+                return self._verdict("overlap_reject", False)
+
+        return self._verdict("embedding", None)
+
+    def _best_ratio(self, guess, references):
+        """Highest difflib ratio between the guess and any reference, using the cheap upper bounds first"""
+        best = 0.0
+        matcher = SequenceMatcher(autojunk=False)
+        matcher.set_seq2(guess)
+        for ref in references:
+            matcher.set_seq1(ref)
+            if matcher.real_quick_ratio() < self.near_ratio or matcher.quick_ratio() < self.near_ratio:
+                continue
+            best = max(best, matcher.ratio())
+        return best
+
+    @staticmethod
+    def _best_overlap(tokens, references):
+        """Highest Jaccard similarity between the guess tokens and any reference"""
+        best = 0.0
+        for ref_tokens in references:
+            if ref_tokens:
+                best = max(best, len(tokens & ref_tokens) / len(tokens | ref_tokens))
+        return best
+
+    def stats(self):
+        """Return per-stage hit counts and the share of guesses settled without embeddings"""
+        total = sum(self.counts.values())
+        settled = total - self.counts["embedding"]
+        return {**self.counts, "embedding_calls_saved": settled,
+                "saved_rate": settled / total if total else 0.0}
@@ -0,0 +1,96 @@
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class MemoEntry:
+    """Unit-length embedding of a guess and its scores per scoring method"""
+
+    __slots__ = ("vector", "scores", "size", "expires_at")
+
+    def __init__(self, vector, size, expires_at):
+        self.vector = vector
+        self.scores = {}
+        self.size = size
+        self.expires_at = expires_at
+
+
+class AnswerMemo:
+    """LRU cache of Game 4 guesses with a TTL and a memory budget in bytes
+
+    Keys are normalized guesses, so "answer dots" and "Answer: dots?" share one
+    entry. Each entry holds the guess embedding and the (correct, wrong) scores
+    already computed for it, keyed by (method, top_k), since chats sharing an
+    EmbeddingService may score differently.
+    """
+
+    # Rough per-entry cost of the entry object, the dict slot and the score tuples
+    ENTRY_OVERHEAD = 400
+
+    def __init__(self, max_bytes=8_000_000, ttl=3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Return the live entry for key, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, vector):
+        """Store the embedding of a guess and return its entry"""
+        vector = np.asarray(vector, dtype=np.float32)
+        size = vector.nbytes + sys.getsizeof(key) + self.ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return MemoEntry(vector, size, 0)
+
+        if key in self._entries:
+            self._remove(key)
+        entry = MemoEntry(vector, size, time.monotonic() + self.ttl)
+        self._entries[key] = entry
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+
+    def clear(self):
+        """Drop every entry"""
+        self._entries.clear()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Return size and hit/miss counters for reporting"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
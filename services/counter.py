@@ -1,39 +1,56 @@
-import os
 import random
 
+from services.write_ahead_log import WriteAheadLog
+
 
 class MessageCounter:
     """Manages message counting and persistence"""
     
-    def __init__(self, min_count, max_count, logger):
-        self.message_count_file = 'message_count.txt'
+    def __init__(self, min_count, max_count, logger, message_count_file='message_count.txt',
+                 flush_interval=0.05, flush_events=1000, compact_records=10000):
+        self.message_count_file = message_count_file
         self.message_count = 0
         self.target_count = random.randint(min_count, max_count)
         self.last_trigger = 0
         self.logger = logger
+        self.wal = WriteAheadLog(message_count_file, logger, flush_interval, flush_events, compact_records)
         
         self.load_message_count()
         
     def load_message_count(self):
-        """Load message count from file"""
-        if os.path.exists(self.message_count_file):
-            try:
-                with open(self.message_count_file, 'r') as f:
-                    self.message_count = int(f.read().strip())
-                    self.logger.info(f"Resumed message count from file: {self.message_count}")
-            except Exception as e:
-                self.logger.warning(f"Failed to read message count file: {e}")
-                self.message_count = 0
+        """Load message count from the snapshot plus any increments logged after it"""
+        try:
+            message_count = self.wal.recover()
+            if message_count is not None:
+                self.message_count = message_count
+                self.logger.info(f"Resumed message count from file: {self.message_count}")
+            self.wal.start(self.message_count)
+        except Exception as e:
+            self.logger.warning(f"Failed to read message count file: {e}")
+            self.message_count = 0
+    
+    def reset(self):
+        """Start counting from zero for a new game"""
+        self.last_trigger = 0
+        self.set_count(0)
     
-    def save_message_count(self):
-        """Save message count to file"""
+    def set_count(self, message_count):
+        """Replace the count and snapshot it at once"""
+        self.message_count = message_count
         try:
-            with open(self.message_count_file, 'w') as f:
-                f.write(str(self.message_count))
+            self.wal.sync(message_count)
         except Exception as e:
             self.logger.error(f"Error saving message count: {e}")
     
     def increment(self):
         """Increment message count"""
         self.message_count += 1
+        self.wal.record(self.message_count)
         return self.message_count
+    
+    def close(self):
+        """Flush the message count and stop its log writer"""
+        try:
+            self.wal.close(self.message_count)
+        except Exception as e:
+            self.logger.error(f"Error saving message count: {e}")
@@ -1,30 +1,102 @@
+import asyncio
+import os
+import re
+
 import numpy as np
-from openai import OpenAI
 import json
 
+from services.ann_index import LSHIndex
+from services.answer_cascade import normalize_guess
+from services.answer_memo import AnswerMemo
+from services.embedding_cache import EmbeddingCache
+
 
 class EmbeddingService:
-    """Handles text embeddings using OpenAI"""
+    """Handles text embeddings through a pluggable backend (OpenAI or local hashing)"""
     
-    def __init__(self, api_key):
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, backend, logger, cache_dir='embedding_cache', request_timeout=10.0, max_inflight=8,
+                 memo_bytes=8_000_000, memo_ttl=3600, ann_min_references=None, ann_tables=16, ann_bits=12):
+        self.backend = backend
+        self.logger = logger
+        self.cache_dir = cache_dir
+        self.cache = EmbeddingCache(cache_dir, backend.name, logger) if backend.cacheable else None
+        
+        # Async path: bounded concurrency and sharing of identical in-flight requests
+        self.request_timeout = request_timeout
+        self.semaphore = asyncio.Semaphore(max_inflight)
+        self.inflight = {}
         
+        # Guesses repeat a lot; remember their embeddings and scores by normalized text
+        self.memo = AnswerMemo(memo_bytes, memo_ttl)
         
-        # Pre-calculate embeddings if needed
-        self.reference_embedding = []
-        self.reference_wrong_embedding = []
+        # Pre-calculate embeddings if needed, as L2-normalized float32 rows
+        self.reference_matrix = self.normalize_rows([])
+        self.wrong_matrix = self.normalize_rows([])
+        self.correct_references = []
+        self.wrong_references = []
+        self.reference_centroid = None
+        self.wrong_centroid = None
+        
+        # Optional LSH index over correct and wrong rows together, used for MAX and TOPK
+        self.ann_min_references = ann_min_references
+        self.ann_tables = ann_tables
+        self.ann_bits = ann_bits
+        self.index = None
+        self.index_matrix = None
+    
+    async def get_embedding_async(self, text):
+        """Generate embedding without blocking the event loop
+
+        Identical texts requested while one is already in flight share its result.
+        Raises asyncio.TimeoutError if the request takes longer than request_timeout.
+        """
+        task = self.inflight.get(text)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_async(text))
+            self.inflight[text] = task
+            task.add_done_callback(lambda _: self.inflight.pop(text, None))
+        return await asyncio.shield(task)
     
-    def get_embedding(self, text):
-        """Generate embedding for a text string"""
-        response = self.client.embeddings.create(input=[text], model="text-embedding-ada-002")
-        return np.array(response.data[0].embedding)
+    async def _fetch_async(self, text):
+        async with self.semaphore:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(self.backend.submit(text)), self.request_timeout
+            )
+    
+    async def score_answer(self, text, method="MEAN", top_k=3, key=None):
+        """Return (correct, wrong) scores of a guess, reusing earlier results for the same normalized guess
+
+        `key` is normalize_guess(text) when the caller already has it. Raises
+        like get_embedding_async when the guess is not memoized.
+        """
+        if key is None:
+            key = normalize_guess(text)
+        entry = self.memo.get(key)
+        if entry is None:
+            entry = self.memo.put(key, await self.get_embedding_async(text))
+        scores = entry.scores.get((method, top_k))
+        if scores is None:
+            scores = self.score(entry.vector, method, top_k)
+            entry.scores[(method, top_k)] = scores
+        return scores
+    
+    def get_reference_embeddings(self, texts):
+        """Return embeddings for reference texts, only calling the backend for uncached ones"""
+        if self.cache is None:
+            return self.backend.embed(texts)
+        
+        missing = self.cache.missing(texts)
+        if missing:
+            self.logger.info(f"Embedding {len(missing)} references...")
+            self.cache.put_many(missing, self.backend.embed(missing))
+        return [self.cache.get(text) for text in texts]
         
     def initialize_embeddings(self, game, trigger_condition):
         """Pre-calculate embeddings for reference texts if using Game 4"""
         if game != 4:
             return
             
-        print("Initializing embeddings for Game 4...")
+        self.logger.info("Initializing embeddings for Game 4...")
         
         # Load references from references.json
         with open('references.json', 'r') as file:
@@ -38,13 +110,112 @@ class EmbeddingService:
                 combined_references.extend(value)
         
         
-        for ref in correct_reference:
-            print(f"Reference: {ref}")
-            response = self.client.embeddings.create(input=[ref], model="text-embedding-ada-002")
-            self.reference_embedding.append(np.array(response.data[0].embedding))
-    
-        for w in combined_references:
-            print(f"Wrong example: {w}")
-            response = self.client.embeddings.create(input=[w], model="text-embedding-ada-002")
-            self.reference_wrong_embedding.append(np.array(response.data[0].embedding))
+        self.correct_references = correct_reference
+        self.wrong_references = combined_references
+        all_references = correct_reference + combined_references
+        if self.cache is not None:
+            self.logger.info(f"{len(self.cache)} embeddings cached, {len(self.cache.missing(all_references))} to fetch.")
+        self.reference_matrix = self.normalize_rows(self.get_reference_embeddings(correct_reference))
+        self.wrong_matrix = self.normalize_rows(self.get_reference_embeddings(combined_references))
+        self.reference_centroid = self.centroid(self.reference_matrix)
+        self.wrong_centroid = self.centroid(self.wrong_matrix)
+        self.build_index(trigger_condition)
+        self.memo.clear()
+        
+        # Every reference in the file is correct for one condition and wrong for
+        # the others, so anything else in the cache is no longer referenced
+        if self.cache is not None:
+            evicted = self.cache.prune(all_references)
+            if evicted:
+                self.logger.info(f"Evicted {evicted} unreferenced embeddings from the cache.")
 
+    
+    def build_index(self, trigger_condition):
+        """Load or build the LSH index if enabled and there are enough references"""
+        self.index = None
+        self.index_matrix = None
+        total = len(self.reference_matrix) + len(self.wrong_matrix)
+        if self.ann_min_references is None or total < max(self.ann_min_references, 1):
+            return
+        if not len(self.reference_matrix) or not len(self.wrong_matrix):
+            return
+        
+        self.index_matrix = np.ascontiguousarray(np.vstack((self.reference_matrix, self.wrong_matrix)))
+        slug = re.sub(r'[^A-Za-z0-9_.-]', '_', f"{self.backend.name}-{trigger_condition}")
+        path = os.path.join(self.cache_dir, f"{slug}.ann.npz")
+        checksum = LSHIndex.checksum(self.index_matrix)
+        self.index = LSHIndex.load(path, self.index_matrix, checksum, self.ann_tables, self.ann_bits, self.logger)
+        if self.index is None:
+            self.logger.info(f"Building ANN index over {total} references...")
+            self.index = LSHIndex(self.index_matrix, self.ann_tables, self.ann_bits)
+            self.index.save(path, checksum)
+    
+    @staticmethod
+    def normalize_rows(vectors):
+        """Stack vectors into a contiguous float32 matrix with unit-length rows"""
+        if not len(vectors):
+            return np.zeros((0, 0), dtype=np.float32)
+        matrix = np.array(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return np.ascontiguousarray(matrix / norms)
+    
+    @staticmethod
+    def aggregate(similarities, method="MEAN", top_k=3):
+        """Reduce cosine similarities to one score: MEAN, MAX or the mean of the TOPK"""
+        if not len(similarities):
+            return 0.0
+        if method == "MAX":
+            return float(similarities.max())
+        if method == "TOPK":
+            k = min(top_k, len(similarities))
+            return float(np.partition(similarities, -k)[-k:].mean())
+        return float(similarities.mean())
+    
+    def score(self, vector, method="MEAN", top_k=3):
+        """Return (correct, wrong) similarity scores of a vector against the references"""
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        if method not in ("MAX", "TOPK"):
+            # The mean cosine similarity to unit rows is the dot product with their mean row
+            return self.centroid_score(self.reference_centroid, vector), self.centroid_score(self.wrong_centroid, vector)
+        if self.index is not None:
+            return self.score_nearest(vector, method, top_k)
+        return (
+            self.aggregate(self.similarities(self.reference_matrix, vector), method, top_k),
+            self.aggregate(self.similarities(self.wrong_matrix, vector), method, top_k),
+        )
+    
+    def score_nearest(self, vector, method, top_k):
+        """Score against only the LSH candidates, split into correct and wrong rows"""
+        rows = self.index.candidates(vector)
+        if len(rows) < top_k:
+            rows = np.arange(len(self.index_matrix))
+        similarities = self.index_matrix[rows] @ vector
+        correct = rows < len(self.reference_matrix)
+        return (
+            self.aggregate(similarities[correct], method, top_k),
+            self.aggregate(similarities[~correct], method, top_k),
+        )
+    
+    @staticmethod
+    def centroid(matrix):
+        """Mean row of a normalized matrix, or None if it is empty"""
+        if not len(matrix):
+            return None
+        return matrix.mean(axis=0)
+    
+    @staticmethod
+    def centroid_score(centroid, unit_vector):
+        if centroid is None:
+            return 0.0
+        return float(centroid @ unit_vector)
+    
+    @staticmethod
+    def similarities(matrix, unit_vector):
+        """Cosine similarity of a unit vector against every row of a normalized matrix"""
+        if not len(matrix):
+            return np.empty(0, dtype=np.float32)
+        return matrix @ unit_vector
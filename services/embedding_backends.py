@@ -0,0 +1,124 @@
+import re
+import unicodedata
+import zlib
+from concurrent.futures import Future
+
+import numpy as np
+from openai import OpenAI
+
+from services.embedding_batcher import EmbeddingBatcher
+
+
+class EmbeddingBackend:
+    """Turns texts into vectors for Game 4 answer scoring
+
+    `name` identifies the vector space and keys the on-disk cache. The
+    thresholds are the defaults check_correct_answer uses with this backend,
+    since similarity scales differ between models.
+    """
+
+    name = None
+    cacheable = False
+    answer_threshold = 0.88
+    wrong_threshold = 0.8
+
+    def embed(self, texts):
+        """Return one vector per text"""
+        raise NotImplementedError
+
+    def submit(self, text):
+        """Return a concurrent.futures.Future resolving to the vector of one text"""
+        future = Future()
+        try:
+            future.set_result(self.embed([text])[0])
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class OpenAIBackend(EmbeddingBackend):
+    """Embeddings from the OpenAI API, batched and sent concurrently"""
+
+    cacheable = True
+
+    def __init__(self, api_key, model="text-embedding-ada-002", client=None, batch_size=256,
+                 batch_tokens=50_000, max_concurrency=4, batch_window=0.01, request_timeout=10.0):
+        self.name = model
+        self.client = client if client is not None else OpenAI(api_key=api_key, timeout=request_timeout)
+        self.batcher = EmbeddingBatcher(
+            self.client,
+            model,
+            max_batch_size=batch_size,
+            max_batch_tokens=batch_tokens,
+            max_concurrency=max_concurrency,
+            window=batch_window,
+        )
+
+    def embed(self, texts):
+        return self.batcher.embed_many(texts)
+
+    def submit(self, text):
+        return self.batcher.submit(text)
+
+
+class HashingBackend(EmbeddingBackend):
+    """Local embeddings from hashed word and character n-grams
+
+    Each word contributes itself plus its character n-grams (padded with
+    spaces so prefixes and suffixes are distinct). Features are hashed with
+    CRC32 into `dim` buckets with a sign bit, then L2-normalized. Needs no
+    network and embeds a short message in tens of microseconds.
+    """
+
+    WORD = re.compile(r'\w+')
+    # Tuned on MEAN scoring: n-gram vectors of unrelated texts are close to
+    # orthogonal, so both scores sit far lower than with ada-002
+    answer_threshold = 0.25
+    wrong_threshold = 0.15
+
+    def __init__(self, dim=1024, ngram_range=(3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.name = f"hashing-{dim}-{ngram_range[0]}-{ngram_range[1]}"
+
+    def features(self, text):
+        """Return the word and character n-gram features of a text"""
+        text = unicodedata.normalize('NFKC', text).casefold()
+        features = []
+        for word in self.WORD.findall(text):
+            features.append("w:" + word)
+            padded = f" {word} "
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self.features(text)
+            if not features:
+                continue
+            hashes = np.fromiter(
+                (zlib.crc32(feature.encode("utf-8")) for feature in features),
+                dtype=np.uint32,
+                count=len(features),
+            )
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+            matrix[row] = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return list(matrix / norms)
+
+
+def create_backend(config):
+    """Build the embedding backend selected by EMBEDDING_BACKEND"""
+    if config.embedding_backend == "HASHING":
+        return HashingBackend(config.hashing_dim)
+    return OpenAIBackend(
+        config.openai_key,
+        batch_size=config.embedding_batch_size,
+        batch_tokens=config.embedding_batch_tokens,
+        max_concurrency=config.embedding_concurrency,
+        batch_window=config.embedding_batch_window,
+        request_timeout=config.embedding_timeout,
+    )
@@ -0,0 +1,117 @@
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)
+
+
+class EmbeddingBatcher:
+    """Sends embedding requests to the API in batches
+
+    embed_many() splits a list of texts into chunks bounded by count and an
+    estimated token budget and sends up to `max_concurrency` chunks at once.
+    submit() collects single texts that arrive within `window` seconds of each
+    other into one request. Transient API errors are retried with exponential
+    backoff. `client` only needs an OpenAI-style `embeddings.create`, so a
+    local stub can stand in for it.
+    """
+
+    def __init__(self, client, model, max_batch_size=256, max_batch_tokens=50_000,
+                 max_concurrency=4, max_retries=5, backoff=0.5, window=0.01):
+        self.client = client
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.window = window
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embedding")
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+
+    @staticmethod
+    def estimate_tokens(text):
+        """Rough token count; about four characters per token for English text"""
+        return len(text) // 4 + 1
+
+    def chunk(self, texts):
+        """Split texts into batches within the count and token limits"""
+        batch = []
+        tokens = 0
+        for text in texts:
+            text_tokens = self.estimate_tokens(text)
+            if batch and (len(batch) >= self.max_batch_size or tokens + text_tokens > self.max_batch_tokens):
+                yield batch
+                batch = []
+                tokens = 0
+            batch.append(text)
+            tokens += text_tokens
+        if batch:
+            yield batch
+
+    def create(self, texts):
+        """Embed one batch, retrying transient errors; returns vectors in input order"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.embeddings.create(input=texts, model=self.model)
+                break
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+        data = sorted(response.data, key=lambda item: item.index)
+        return [np.array(item.embedding) for item in data]
+
+    def embed_many(self, texts):
+        """Embed a list of texts with concurrent batched requests"""
+        futures = [self.executor.submit(self.create, batch) for batch in self.chunk(texts)]
+        vectors = []
+        for future in futures:
+            vectors.extend(future.result())
+        return vectors
+
+    def submit(self, text):
+        """Queue a single text; returns a Future resolved when its batch completes"""
+        future = Future()
+        with self._lock:
+            self._pending.append((text, future))
+            if len(self._pending) >= self.max_batch_size:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return future
+
+    def _flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            self.executor.submit(self._send, pending)
+
+    def _send(self, pending):
+        # Drop requests whose caller already gave up; the rest can no longer be cancelled
+        pending = [(text, future) for text, future in pending if future.set_running_or_notify_cancel()]
+        for batch in self.chunk([text for text, _ in pending]):
+            batch_pending, pending = pending[:len(batch)], pending[len(batch):]
+            try:
+                vectors = self.create(batch)
+            except Exception as e:
+                for _, future in batch_pending:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch_pending, vectors):
+                future.set_result(vector)
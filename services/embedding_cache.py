@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Content-addressed on-disk cache of embeddings for one model
+
+    Vectors are stored as a single float32 matrix in `<model>.npy`, which is
+    memory-mapped on load. A JSON side index maps sha256(model, text) to a row
+    and records the matrix checksum; a cache that fails the check is discarded.
+    """
+
+    def __init__(self, directory, model, logger):
+        self.directory = directory
+        self.model = model
+        self.logger = logger
+        slug = re.sub(r'[^A-Za-z0-9_.-]', '_', model)
+        self.matrix_path = os.path.join(directory, f"{slug}.npy")
+        self.index_path = os.path.join(directory, f"{slug}.json")
+        self.rows = {}
+        self.matrix = None
+        self.load()
+
+    def key(self, text):
+        """Return the cache key of a text"""
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def checksum(matrix):
+        return hashlib.sha256(np.ascontiguousarray(matrix).tobytes()).hexdigest()
+
+    def load(self):
+        """Load the cache from disk, discarding it if it fails the integrity check"""
+        if not (os.path.exists(self.matrix_path) and os.path.exists(self.index_path)):
+            return
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            matrix = np.load(self.matrix_path, mmap_mode='r')
+            rows = index["rows"]
+            if (index.get("model") != self.model or matrix.dtype != np.float32
+                    or matrix.ndim != 2 or len(matrix) != len(rows)
+                    or index.get("checksum") != self.checksum(matrix)):
+                raise ValueError("index does not match matrix")
+        except Exception as e:
+            self.logger.warning(f"Discarding embedding cache {self.matrix_path}: {e}")
+            self.rows = {}
+            self.matrix = None
+            return
+        self.rows = rows
+        self.matrix = matrix
+
+    def save(self):
+        """Write the matrix and index atomically"""
+        os.makedirs(self.directory, exist_ok=True)
+        matrix = self.matrix if self.matrix is not None else np.zeros((0, 0), dtype=np.float32)
+        index = {"model": self.model, "checksum": self.checksum(matrix), "rows": self.rows}
+
+        tmp_matrix = self.matrix_path + ".tmp"
+        with open(tmp_matrix, 'wb') as f:
+            np.save(f, matrix)
+        tmp_index = self.index_path + ".tmp"
+        with open(tmp_index, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_matrix, self.matrix_path)
+        os.replace(tmp_index, self.index_path)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, text):
+        """Return the cached vector for a text, or None"""
+        row = self.rows.get(self.key(text))
+        if row is None:
+            return None
+        return self.matrix[row]
+
+    def missing(self, texts):
+        """Return the texts that are not cached, without duplicates"""
+        return [text for text in dict.fromkeys(texts) if self.key(text) not in self.rows]
+
+    def put_many(self, texts, vectors):
+        """Add vectors for texts and save"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(vectors):
+            return
+        start = len(self.rows)
+        if self.matrix is None or not len(self.matrix):
+            self.matrix = vectors
+        else:
+            self.matrix = np.concatenate([np.asarray(self.matrix), vectors])
+        for offset, text in enumerate(texts):
+            self.rows[self.key(text)] = start + offset
+        self.save()
+
+    def prune(self, texts):
+        """Evict every entry whose text is not in `texts`; return the number evicted"""
+        keep = {self.key(text) for text in texts}
+        stale = [key for key in self.rows if key not in keep]
+        if not stale:
+            return 0
+        kept = sorted((row, key) for key, row in self.rows.items() if key in keep)
+        self.matrix = np.asarray(self.matrix)[[row for row, _ in kept]]
+        self.rows = {key: new_row for new_row, (_, key) in enumerate(kept)}
+        self.save()
+        return len(stale)
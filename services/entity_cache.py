@@ -0,0 +1,80 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class EntityCache:
+    """LRU cache for sender and chat lookups with a TTL and negative caching"""
+
+    MISSING = object()
+
+    def __init__(self, max_size=1024, ttl=600, negative_ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+
+    def get(self, key):
+        """Return a cached value, or EntityCache.MISSING if absent or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return self.MISSING
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return self.MISSING
+
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """Store a value; None is cached for the shorter negative TTL"""
+        ttl = self.negative_ttl if value is None else self.ttl
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_or_fetch(self, key, fetch):
+        """Return the cached value for key, awaiting fetch() on a miss
+
+        Concurrent misses for the same key share one fetch.
+        """
+        value = self.get(key)
+        if value is not self.MISSING:
+            self.hits += 1
+            return value
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            value = await fetch()
+        except Exception:
+            value = None
+            raise
+        finally:
+            self.put(key, value)
+            self._pending.pop(key, None)
+            if not future.done():
+                future.set_result(value)
+        return value
+
+    def stats(self):
+        """Return hit/miss counters for reporting"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
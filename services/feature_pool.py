@@ -0,0 +1,172 @@
+import asyncio
+import json
+import multiprocessing
+import time
+
+from games.features import FeatureExtractor
+from games.message_view import MessageView
+
+
+_extractor = None
+
+
+def _init_worker(char_list_path):
+    global _extractor
+    with open(char_list_path, "r") as file:
+        _extractor = FeatureExtractor(json.load(file))
+
+
+def _extract(text):
+    return _extractor.extract(MessageView(text))
+
+
+class FeaturePool:
+    """Extracts Game 4 features of very long messages in a worker process
+
+    NFD normalization and the character histogram hold the GIL, so a thread
+    would still stall the event loop; a process does not. Messages are handed
+    to the worker one at a time, and each gets `timeout` seconds from the
+    moment the worker takes it, so time spent waiting behind another message
+    does not count. A message that runs over gets the worker killed and
+    replaced and extract() returns None, which callers treat as "no trigger";
+    the messages waiting behind it are unaffected. Messages shorter than
+    `cutoff` characters are cheaper to extract inline than to hand off; see
+    benchmark_cutoff().
+    """
+
+    # Seconds a fresh worker may take to start before its first message is timed
+    START_TIMEOUT = 30.0
+
+    def __init__(self, logger, cutoff=2048, timeout=0.5, char_list_path="char_list.json"):
+        self.logger = logger
+        self.cutoff = cutoff
+        self.timeout = timeout
+        self.char_list_path = char_list_path
+        self._lock = None
+        self._warm_up = None
+
+        # Metrics
+        self.offloaded = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.restarts = 0
+
+        # Started up front so that process start-up does not count against the first message
+        self._pool = self._start()
+
+    def _start(self):
+        # Spawned rather than forked: the bot process has logging and client threads
+        context = multiprocessing.get_context("spawn")
+        pool = context.Pool(1, initializer=_init_worker, initargs=(self.char_list_path,))
+        self._warm_up = pool.apply_async(_extract, ("",))
+        return pool
+
+    def _restart(self):
+        self._pool.terminate()
+        self.restarts += 1
+        self._pool = self._start()
+
+    def _submit(self, text):
+        """Hand a message to the worker; returns a future for its features"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(result):
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(result))
+
+        def reject(error):
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_exception(error))
+
+        self._pool.apply_async(_extract, (text,), callback=resolve, error_callback=reject)
+        return future
+
+    async def _wait_ready(self):
+        """Wait, outside any message's budget, for a fresh worker to finish starting"""
+        warm_up, self._warm_up = self._warm_up, None
+        if warm_up is not None and not warm_up.ready():
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, warm_up.wait, self.START_TIMEOUT)
+
+    async def extract(self, text):
+        """Return the MessageFeatures of a message's text from the worker, or None past the time budget"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await self._wait_ready()
+            self.offloaded += 1
+            # The worker is idle here, so this message starts running as soon as it is sent
+            future = self._submit(text)
+            try:
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                self.logger.warning(f"Feature extraction of a {len(text)} character message timed out.")
+                self._restart()
+            except asyncio.CancelledError:
+                # The message may still be running; do not leave it in front of the next one
+                self._restart()
+                raise
+            except Exception as e:
+                self.failures += 1
+                self.logger.error(f"Error extracting features in worker: {e}")
+        return None
+
+    def close(self):
+        """Stop the worker process"""
+        self._pool.terminate()
+
+    def stats(self):
+        return {
+            "offloaded": self.offloaded,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "restarts": self.restarts,
+        }
+
+
+def benchmark_cutoff(extractor, pool, lengths=(256, 512, 1024, 2048, 4096, 8192, 16384), repeats=20):
+    """Time inline extraction of each message length against the fixed cost of a hand-off
+
+    Returns (overhead, rows, cutoff): the round trip of a one-character
+    message, rows of (length, inline seconds, round trip seconds) and the
+    shortest length whose inline extraction blocks the loop for longer than
+    the hand-off costs, or None if none does.
+    """
+    async def timed(call, text):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            result = call(text)
+            if asyncio.iscoroutine(result):
+                await result
+        return (time.perf_counter() - started) / repeats
+
+    async def run():
+        await pool.extract("warm up")
+        overhead = await timed(pool.extract, ".")
+        rows = []
+        for length in lengths:
+            # Pasted walls of text: a base letter under a stack of combining marks
+            text = (("o" + "\u0323\u0307\u0308" * 5) * (length // 16 + 1))[:length]
+            inline = await timed(lambda text: extractor.extract(MessageView(text)), text)
+            rows.append((length, inline, await timed(pool.extract, text)))
+        return overhead, rows
+
+    overhead, rows = asyncio.run(run())
+    cutoff = next((length for length, inline, _ in rows if inline > overhead), None)
+    return overhead, rows, cutoff
+
+
+if __name__ == "__main__":
+    import logging
+
+    with open("char_list.json", "r") as file:
+        inline_extractor = FeatureExtractor(json.load(file))
+    feature_pool = FeaturePool(logging.getLogger(__name__), timeout=5.0)
+    try:
+        hand_off, results, best = benchmark_cutoff(inline_extractor, feature_pool)
+    finally:
+        feature_pool.close()
+    print(f"Hand-off round trip: {hand_off * 1e6:.1f}us")
+    for length, inline, offload in results:
+        print(f"{length:>6} chars: inline {inline * 1e6:8.1f}us, worker round trip {offload * 1e6:8.1f}us")
+    print(f"Suggested FEATURE_OFFLOAD_CHARS: {best}")
@@ -0,0 +1,346 @@
+import asyncio
+import heapq
+import inspect
+import itertools
+import json
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+
+class CronSchedule:
+    """A five-field cron expression: minute hour day-of-month month day-of-week
+
+    Fields accept *, numbers, lists, ranges and steps ("*/15", "1-5", "0,30").
+    Day of week runs from 0 (Sunday) to 6. As in cron, when both day fields
+    are restricted a day matching either one fires.
+    """
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression, tz):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.tz = tz
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self.parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES)
+        )
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def parse(field, low, high):
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step = part.split("/")
+                step = int(step)
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = map(int, part.split("-"))
+            else:
+                start = end = int(part)
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"cron field {field!r} is out of range {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return sorted(values)
+
+    def day_matches(self, day):
+        in_days = day.day in self.days
+        in_weekdays = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, timestamp):
+        """Return the first firing time strictly after a Unix timestamp"""
+        local = datetime.fromtimestamp(timestamp, self.tz).replace(tzinfo=None)
+        start = local.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(366 * 5):
+            if day.month in self.months and self.day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return self.tz.localize(candidate).timestamp()
+            day += timedelta(days=1)
+        raise ValueError(f"cron expression {self.expression!r} never fires")
+
+
+class Job:
+    """A scheduled call of a registered action"""
+
+    __slots__ = ("job_id", "action", "payload", "due", "interval", "cron", "persist", "version")
+
+    def __init__(self, job_id, action, payload, due, interval=None, cron=None, persist=True):
+        self.job_id = job_id
+        self.action = action
+        self.payload = payload
+        self.due = due
+        self.interval = interval
+        self.cron = cron
+        self.persist = persist
+        self.version = 0
+
+    @property
+    def recurring(self):
+        return self.interval is not None or self.cron is not None
+
+
+class Scheduler:
+    """One task running every timed job from a min-heap of due times
+
+    Jobs are one-shot (`at`), recurring (`every` seconds) or cron-like
+    (`cron`), and call an action registered by name with a JSON payload, so
+    persistent jobs survive a restart in the `scheduled_jobs` table of the
+    state database. One-shot jobs that have run are remembered with their due
+    time so they are not scheduled again. Jobs missed while the bot was down
+    follow `catch_up`: RUN fires each one once on startup, SKIP drops missed
+    one-shot jobs and moves recurring ones to their next time. Either way,
+    jobs missed by more than `max_lateness` seconds are skipped. A handler
+    that returns False has not done its work yet: its job is tried again
+    RETRY_DELAY seconds later, and a one-shot job only counts as run once a
+    try does not return False.
+    """
+
+    RETRY_DELAY = 5.0
+
+    def __init__(self, path, logger, catch_up="RUN", max_lateness=3600, timezone='Asia/Singapore'):
+        self.logger = logger
+        self.catch_up = catch_up
+        self.max_lateness = max_lateness
+        self.tz = pytz.timezone(timezone)
+        self.actions = {}
+        self.jobs = {}
+        self.done = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dirty = set()
+        self._tasks = set()
+
+        # Metrics
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.deferred = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                job_id TEXT PRIMARY KEY,
+                action TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                due REAL NOT NULL,
+                interval REAL,
+                cron TEXT,
+                done INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.connection.commit()
+        self.load()
+
+    def load(self):
+        """Restore persisted jobs, applying the catch-up rule to those already due"""
+        now = time.time()
+        rows = self.connection.execute(
+            "SELECT job_id, action, payload, due, interval, cron, done FROM scheduled_jobs"
+        ).fetchall()
+        for job_id, action, payload, due, interval, cron, done in rows:
+            if done:
+                self.done[job_id] = due
+                continue
+            try:
+                job = Job(job_id, action, json.loads(payload), due, interval,
+                          CronSchedule(cron, self.tz) if cron else None)
+            except ValueError as e:
+                self.logger.error(f"Dropping scheduled job {job_id}: {e}")
+                continue
+            if due < now and (self.catch_up == "SKIP" or now - due > self.max_lateness):
+                self.skipped += 1
+                self.logger.warning(f"Skipping job {job_id} missed at {datetime.fromtimestamp(due, self.tz)}.")
+                if not job.recurring:
+                    self._mark_done(job)
+                    continue
+                job.due = self.next_due(job, now)
+                self._dirty.add(job_id)
+            self._push(job)
+        self.flush()
+        if self.jobs:
+            self.logger.info(f"Restored {len(self.jobs)} scheduled jobs.")
+
+    def register(self, action, handler):
+        """Name a handler for jobs; it is called with the job's payload and may be a coroutine"""
+        self.actions[action] = handler
+
+    def schedule(self, job_id, action, payload=None, at=None, every=None, cron=None, persist=True, replace=True):
+        """Add or replace a job; with replace=False an existing job with the same id is kept
+
+        `at` is a Unix timestamp for a one-shot job. Recurring jobs first run
+        `every` seconds from now, or at the next cron time.
+        """
+        existing = self.jobs.get(job_id)
+        if existing is not None and not replace:
+            return existing
+
+        now = time.time()
+        cron_schedule = CronSchedule(cron, self.tz) if cron else None
+        job = Job(job_id, action, payload or {}, 0.0, every, cron_schedule, persist)
+        job.due = at if at is not None else self.next_due(job, now)
+        self._push(job)
+        if persist:
+            self._dirty.add(job_id)
+        return job
+
+    def cancel(self, job_id):
+        """Remove a pending job; its stale heap entry is skipped when it comes up"""
+        job = self.jobs.pop(job_id, None)
+        if job is not None and job.persist:
+            self._dirty.add(job_id)
+        return job is not None
+
+    def cancel_prefix(self, prefix):
+        """Remove every pending job whose id starts with prefix"""
+        cancelled = [job_id for job_id in self.jobs if job_id.startswith(prefix)]
+        for job_id in cancelled:
+            self.cancel(job_id)
+        return len(cancelled)
+
+    def ran(self, job_id, due):
+        """Check whether a one-shot job already ran at this due time"""
+        return self.done.get(job_id) == due
+
+    def next_due(self, job, now):
+        if job.cron is not None:
+            return job.cron.next_after(now)
+        return now + job.interval
+
+    def _push(self, job, at=None):
+        # A fresh version per push marks every older heap entry for this id as stale
+        job.version = next(self._seq)
+        self.jobs[job.job_id] = job
+        heapq.heappush(self._heap, (job.due if at is None else at, next(self._seq), job.job_id, job.version))
+        if self._heap[0][2] == job.job_id:
+            self._wakeup.set()
+
+    def _mark_done(self, job):
+        self.jobs.pop(job.job_id, None)
+        if job.persist:
+            self.done[job.job_id] = job.due
+            self._dirty.add(job.job_id)
+
+    async def run(self):
+        """Run jobs as they come due until cancelled"""
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, job_id, version = heapq.heappop(self._heap)
+                job = self.jobs.get(job_id)
+                if job is None or job.version != version:
+                    continue
+                self._start(job, now)
+                if job.recurring:
+                    job.due = self.next_due(job, now)
+                    self._push(job)
+                    if job.persist:
+                        self._dirty.add(job_id)
+            self.flush()
+
+            self._wakeup.clear()
+            timeout = max(self._heap[0][0] - time.time(), 0) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _start(self, job, now):
+        lag = now - job.due
+        self.runs += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        handler = self.actions.get(job.action)
+        if handler is None:
+            self.failures += 1
+            self.logger.error(f"No handler registered for job {job.job_id} ({job.action}).")
+            if not job.recurring:
+                self._mark_done(job)
+            return
+        # Jobs run as their own tasks so a slow one cannot delay the others
+        task = asyncio.create_task(self._execute(job, handler))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, job, handler):
+        version = job.version
+        try:
+            result = handler(job.payload)
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            self.failures += 1
+            self.logger.error(f"Scheduled job {job.job_id} failed: {e}")
+            result = None
+        # Recurring jobs are already rescheduled; skip one-shot jobs replaced or cancelled meanwhile
+        if job.recurring or self.jobs.get(job.job_id) is not job or job.version != version:
+            return
+        if result is False:
+            self.deferred += 1
+            self._push(job, at=time.time() + self.RETRY_DELAY)
+        else:
+            self._mark_done(job)
+            self.flush()
+
+    def flush(self):
+        """Write the persistent jobs that changed since the last flush"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        upserts = []
+        deletes = []
+        for job_id in dirty:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                upserts.append((job_id, job.action, json.dumps(job.payload), job.due, job.interval,
+                                job.cron.expression if job.cron else None, 0))
+            elif job_id in self.done:
+                upserts.append((job_id, "", "{}", self.done[job_id], None, None, 1))
+            else:
+                deletes.append((job_id,))
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO scheduled_jobs VALUES (?, ?, ?, ?, ?, ?, ?)", upserts
+                )
+                self.connection.executemany("DELETE FROM scheduled_jobs WHERE job_id = ?", deletes)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error saving scheduled jobs: {e}")
+            self._dirty |= dirty
+
+    def close(self):
+        """Save pending changes and close the database"""
+        self.flush()
+        self.connection.close()
+
+    def stats(self):
+        """Return queue size and lag metrics for reporting"""
+        return {
+            "jobs": len(self.jobs),
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "deferred": self.deferred,
+            "avg_lag": self.total_lag / self.runs if self.runs else 0.0,
+            "max_lag": self.max_lag,
+            "next_in": max(self._heap[0][0] - time.time(), 0) if self._heap else None,
+        }
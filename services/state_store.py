@@ -0,0 +1,140 @@
+import sqlite3
+import time
+
+
+STATUS_ACTIVE = "ACTIVE"
+STATUS_FINISHED = "FINISHED"
+
+
+class StateStore:
+    """Per-chat game state in SQLite (WAL mode) so a restart resumes the same game
+
+    The live GameSession objects are the in-memory copy that the game reads.
+    flush() snapshots every session and writes the rows that changed since the
+    last flush in one transaction; the scheduler runs it every
+    STATE_FLUSH_INTERVAL seconds. A resumed game takes its message count from
+    the same row as its last message id, not from the counter's write-ahead
+    log: the log can be ahead of the row after a crash, and catch-up replays
+    every message after that id, so counting from the log would count those
+    messages twice.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS game_state (
+            chat_id INTEGER PRIMARY KEY,
+            game INTEGER NOT NULL,
+            message_count INTEGER NOT NULL,
+            target_count INTEGER NOT NULL,
+            last_trigger INTEGER NOT NULL,
+            loser TEXT NOT NULL,
+            last_message_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path, logger):
+        self.path = path
+        self.logger = logger
+        self.sessions = []
+        self.writes = 0
+        self.flushes = 0
+        self._written = {}
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(self.SCHEMA)
+        self.connection.commit()
+        self._rows = {
+            row[0]: row for row in self.connection.execute(
+                "SELECT chat_id, game, message_count, target_count, last_trigger, loser, "
+                "last_message_id, status FROM game_state"
+            )
+        }
+
+    def restore(self, session):
+        """Load a chat's saved state into its session and track it from now on
+
+        A finished game, a different game type or a target outside the current
+        range starts a new game instead. A new game's counter starts again
+        from zero, as the message count file still holds the old game's count.
+        """
+        self.sessions.append(session)
+        row = self._rows.get(session.chat_id)
+        if row is None:
+            return False
+
+        _, game, message_count, target_count, last_trigger, loser, last_message_id, status = row
+        config = session.config
+        if status != STATUS_ACTIVE or game != config.game:
+            self.logger.info(f"Starting a new game in chat {session.chat_id}.")
+            session.counter.reset()
+            session.last_message_id = 0
+            return False
+        session.last_message_id = last_message_id
+        if session.counter.message_count != message_count:
+            self.logger.info(f"Message count for chat {session.chat_id} resumes at {message_count} "
+                             f"(log had {session.counter.message_count}); catch-up replays the rest.")
+            session.counter.set_count(message_count)
+        if config.game == 2 and not config.min_num <= target_count <= config.max_num:
+            self.logger.warning(f"Saved target for chat {session.chat_id} is outside the configured range, picking a new one.")
+        else:
+            session.counter.target_count = target_count
+        session.counter.last_trigger = last_trigger
+        session.controller.loser = loser
+        self._written[session.chat_id] = row
+        self.logger.info(f"Resumed game state for chat {session.chat_id}.")
+        return True
+
+    @staticmethod
+    def snapshot(session):
+        return (
+            session.chat_id,
+            session.config.game,
+            session.counter.message_count,
+            session.counter.target_count,
+            session.counter.last_trigger,
+            session.controller.loser,
+            session.last_message_id,
+            STATUS_ACTIVE if session.active else STATUS_FINISHED,
+        )
+
+    def flush(self):
+        """Write the state of every chat that changed since the last flush"""
+        changed = []
+        for session in self.sessions:
+            row = self.snapshot(session)
+            if self._written.get(session.chat_id) != row:
+                changed.append(row)
+        if not changed:
+            return 0
+
+        now = time.time()
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO game_state VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [row + (now,) for row in changed],
+                )
+        except sqlite3.Error as e:
+            self.logger.error(f"Error saving game state: {e}")
+            return 0
+        for row in changed:
+            self._written[row[0]] = row
+        self.writes += len(changed)
+        self.flushes += 1
+        return len(changed)
+
+    def close(self):
+        """Write any pending changes and close the database"""
+        self.flush()
+        self.connection.close()
+
+    def stats(self):
+        """Return write counters for reporting"""
+        return {
+            "chats": len(self.sessions),
+            "flushes": self.flushes,
+            "rows_written": self.writes,
+        }
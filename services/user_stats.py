@@ -0,0 +1,112 @@
+import heapq
+import sqlite3
+
+
+FIELDS = ("messages", "triggers", "losses", "correct_guesses", "near_misses")
+
+
+class UserRecord:
+    """Counters for one user in one chat"""
+
+    __slots__ = ("name",) + FIELDS
+
+    def __init__(self, name=None, messages=0, triggers=0, losses=0, correct_guesses=0, near_misses=0):
+        self.name = name
+        self.messages = messages
+        self.triggers = triggers
+        self.losses = losses
+        self.correct_guesses = correct_guesses
+        self.near_misses = near_misses
+
+    def row(self):
+        return (self.name,) + tuple(getattr(self, field) for field in FIELDS)
+
+
+class UserStats:
+    """Per-chat, per-user message and game counters with leaderboards
+
+    Counters live in memory and each update is a dict lookup and an add.
+    flush() writes the users that changed to the `user_stats` table of the
+    state database; the scheduler runs it every STATS_FLUSH_INTERVAL seconds. top() uses heapq.nlargest, so a
+    leaderboard costs O(n log k) rather than a full sort.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS user_stats (
+            chat_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            name TEXT,
+            messages INTEGER NOT NULL,
+            triggers INTEGER NOT NULL,
+            losses INTEGER NOT NULL,
+            correct_guesses INTEGER NOT NULL,
+            near_misses INTEGER NOT NULL,
+            PRIMARY KEY (chat_id, user_id)
+        )
+    """
+
+    def __init__(self, path, logger):
+        self.path = path
+        self.logger = logger
+        self.chats = {}
+        self._dirty = set()
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(self.SCHEMA)
+        self.connection.commit()
+        for chat_id, user_id, *values in self.connection.execute(
+            "SELECT chat_id, user_id, name, messages, triggers, losses, correct_guesses, near_misses FROM user_stats"
+        ):
+            self.chats.setdefault(chat_id, {})[user_id] = UserRecord(*values)
+
+    def _record(self, chat_id, user_id, name):
+        users = self.chats.get(chat_id)
+        if users is None:
+            users = self.chats[chat_id] = {}
+        record = users.get(user_id)
+        if record is None:
+            record = users[user_id] = UserRecord(name)
+        elif name is not None:
+            record.name = name
+        self._dirty.add((chat_id, user_id))
+        return record
+
+    def add(self, chat_id, user_id, field, name=None):
+        """Add one to a user's counter"""
+        record = self._record(chat_id, user_id, name)
+        setattr(record, field, getattr(record, field) + 1)
+
+    def message(self, chat_id, user_id, name=None):
+        """Count a message; the hot-path form of add(..., "messages")"""
+        self._record(chat_id, user_id, name).messages += 1
+
+    def top(self, chat_id, field, k=5):
+        """Return the k users with the highest counter as (name or id, value) pairs"""
+        users = self.chats.get(chat_id, {})
+        leaders = heapq.nlargest(k, users.items(), key=lambda item: getattr(item[1], field))
+        return [(record.name or str(user_id), getattr(record, field))
+                for user_id, record in leaders if getattr(record, field)]
+
+    def flush(self):
+        """Write every user whose counters changed since the last flush"""
+        if not self._dirty:
+            return 0
+        dirty, self._dirty = self._dirty, set()
+        rows = [(chat_id, user_id) + self.chats[chat_id][user_id].row() for chat_id, user_id in dirty]
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO user_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+        except sqlite3.Error as e:
+            self.logger.error(f"Error saving user stats: {e}")
+            self._dirty |= dirty
+            return 0
+        return len(rows)
+
+    def close(self):
+        """Write any pending changes and close the database"""
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,179 @@
+import os
+import threading
+import zlib
+
+
+class WriteAheadLog:
+    """Crash-safe persistence of one integer, with group commit
+
+    The snapshot at `path` holds the plain value, as message_count.txt always
+    has, and is only ever replaced by an atomic rename. Changes go to
+    `path`.wal instead: a background thread appends one checksummed record
+    with the latest value whenever `flush_events` changes are pending or
+    `flush_interval` seconds after the first one, then fsyncs. Once the log
+    holds `compact_records` records it is folded into a new snapshot and
+    truncated. recover() returns the last intact record, or the snapshot.
+    """
+
+    def __init__(self, path, logger, flush_interval=0.05, flush_events=1000, compact_records=10000):
+        self.path = path
+        self.log_path = path + ".wal"
+        self.logger = logger
+        self.flush_interval = flush_interval
+        self.flush_events = flush_events
+        self.compact_records = compact_records
+
+        self.commits = 0
+        self.events = 0
+        self.records = 0
+        self._file = None
+        self._thread = None
+        self._closed = False
+        self._value = None
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+
+    @staticmethod
+    def encode(value):
+        data = str(value)
+        return f"{data} {zlib.crc32(data.encode('ascii')):08x}\n"
+
+    @staticmethod
+    def decode(line):
+        """Return the value of an intact record, or None for a torn or corrupt one"""
+        if not line.endswith("\n"):
+            return None
+        try:
+            data, checksum = line.split()
+            if int(checksum, 16) != zlib.crc32(data.encode('ascii')):
+                return None
+            return int(data)
+        except ValueError:
+            return None
+
+    def recover(self):
+        """Return the last persisted value, or None if nothing was ever saved"""
+        value = None
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    value = int(f.read().strip())
+            except Exception as e:
+                self.logger.warning(f"Failed to read snapshot {self.path}: {e}")
+
+        if os.path.exists(self.log_path):
+            replayed = 0
+            with open(self.log_path, 'r', encoding='ascii', errors='replace') as f:
+                for line in f:
+                    record = self.decode(line)
+                    if record is None:
+                        self.logger.warning(f"Ignoring torn tail of {self.log_path} after {replayed} records.")
+                        break
+                    value = record
+                    replayed += 1
+            if replayed:
+                self.logger.info(f"Replayed {replayed} records from {self.log_path}.")
+        return value
+
+    def start(self, value):
+        """Write a fresh snapshot of the recovered value and start the commit thread"""
+        self._file = open(self.log_path, 'a', encoding='ascii')
+        self._compact(value)
+        self._thread = threading.Thread(target=self._run, name=f"wal-{os.path.basename(self.path)}", daemon=True)
+        self._thread.start()
+
+    def record(self, value):
+        """Queue a new value; durable after the next group commit"""
+        with self._cond:
+            self._value = value
+            self._pending += 1
+            if self._pending == 1 or self._pending >= self.flush_events:
+                self._cond.notify()
+
+    def sync(self, value):
+        """Commit and snapshot a value immediately"""
+        if self._closed or self._file is None:
+            return
+        with self._io_lock:
+            with self._cond:
+                self._pending = 0
+                self._value = None
+            self._compact(value)
+
+    def close(self, value):
+        """Snapshot the final value and stop the commit thread"""
+        if self._closed or self._thread is None:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        with self._io_lock:
+            self._compact(value)
+            self._file.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._pending < self.flush_events and not self._closed:
+                    self._cond.wait(self.flush_interval)
+            # Take the value under the I/O lock so a concurrent sync() cannot be overwritten by an older one
+            with self._io_lock:
+                with self._cond:
+                    value, pending = self._value, self._pending
+                    self._value, self._pending = None, 0
+                    closed = self._closed
+                if pending:
+                    try:
+                        self._commit(value, pending)
+                    except Exception as e:
+                        self.logger.error(f"Error writing {self.log_path}: {e}")
+            if closed:
+                return
+
+    def _commit(self, value, events):
+        self._file.write(self.encode(value))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.commits += 1
+        self.events += events
+        self.records += 1
+        if self.records >= self.compact_records:
+            self._compact(value)
+
+    def _compact(self, value):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(str(value))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._fsync_directory()
+        # Every record in the log is now covered by the snapshot
+        self._file.truncate(0)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.records = 0
+
+    def _fsync_directory(self):
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def stats(self):
+        """Return commit counters for reporting"""
+        return {
+            "commits": self.commits,
+            "events": self.events,
+            "events_per_commit": self.events / self.commits if self.commits else 0.0,
+        }
@@ -0,0 +1,64 @@
+import threading
+from types import SimpleNamespace
+
+from services.embedding_batcher import EmbeddingBatcher
+
+
+class StubClient:
+    """OpenAI-style client that records the size of every batch it receives"""
+
+    def __init__(self):
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+        self.embeddings = self
+
+    def create(self, input, model):
+        with self._lock:
+            self.batch_sizes.append(len(input))
+        # Returned out of order; the batcher must sort by index
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), float(i)]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+def test_embed_many_chunks_by_count():
+    client = StubClient()
+    batcher = EmbeddingBatcher(client, "stub", max_batch_size=3, max_concurrency=1)
+    texts = ["a", "bb", "ccc", "dddd"]
+
+    vectors = batcher.embed_many(texts)
+
+    assert client.batch_sizes == [3, 1]
+    assert [vector[0] for vector in vectors] == [1, 2, 3, 4]
+
+
+def test_embed_many_chunks_by_tokens():
+    client = StubClient()
+    batcher = EmbeddingBatcher(client, "stub", max_batch_size=10, max_batch_tokens=5, max_concurrency=1)
+
+    # Each 8-character text is estimated at 3 tokens, so only one fits under the budget
+    batcher.embed_many(["x" * 8] * 3)
+
+    assert client.batch_sizes == [1, 1, 1]
+
+
+def test_submit_batches_texts_within_window():
+    client = StubClient()
+    batcher = EmbeddingBatcher(client, "stub", max_batch_size=3, window=0.05)
+
+    futures = [batcher.submit(text) for text in ["a", "bb", "ccc", "dddd", "eeeee"]]
+    vectors = [future.result(timeout=5) for future in futures]
+
+    # The first three fill a batch at once; the other two go out when the window closes
+    assert client.batch_sizes == [3, 2]
+    assert [vector[0] for vector in vectors] == [1, 2, 3, 4, 5]
+
+
+def test_submit_skips_cancelled_requests():
+    client = StubClient()
+    batcher = EmbeddingBatcher(client, "stub", max_batch_size=10, window=0.05)
+
+    kept = batcher.submit("keep")
+    batcher.submit("drop").cancel()
+
+    assert kept.result(timeout=5)[0] == 4
+    assert client.batch_sizes == [1]
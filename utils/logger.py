@@ -1,16 +1,175 @@
 import logging
+import logging.handlers
+import queue
+import random
+import threading
+
+
+LOG_FORMAT = '[%(asctime)s] %(levelname)s - %(message)s'
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler that only flushes when told to, once per batch"""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class SamplingFilter(logging.Filter):
+    """Let through only a fraction of DEBUG records"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+class BatchingQueueListener:
+    """Background thread that drains the log queue and writes records in batches"""
+
+    _STOP = object()
+
+    def __init__(self, queue_handler, handlers, batch_size=256):
+        self.queue_handler = queue_handler
+        self.queue = queue_handler.queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._reported_drops = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        # Block here: shutdown must not lose the sentinel to a full queue
+        self.queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = False
+            for record in batch:
+                if record is self._STOP:
+                    stopping = True
+                    continue
+                self._handle(record)
+            self._report_drops()
+            self._flush()
+
+            if stopping:
+                return
+
+    def _handle(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _report_drops(self):
+        dropped = self.queue_handler.dropped
+        if dropped > self._reported_drops:
+            self._handle(logging.makeLogRecord({
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": f"Log queue overflowed, {dropped - self._reported_drops} records dropped "
+                       f"({dropped} total).",
+            }))
+            self._reported_drops = dropped
+
+    def _flush(self):
+        for handler in self.handlers:
+            if isinstance(handler, BatchRotatingFileHandler):
+                handler.flush_batch()
+            else:
+                handler.flush()
 
 
 class Logger:
-    """Sets up and manages logging"""
-    
-    def __init__(self):
-        logging.basicConfig(
-            level=logging.INFO,
-            format='[%(asctime)s] %(levelname)s - %(message)s',
-            handlers=[
+    """Sets up and manages logging
+
+    In QUEUED mode the event loop only enqueues records; a background listener
+    formats them, writes them in batches and rotates bot.log by size.
+    """
+
+    def __init__(self, mode="QUEUED", level="INFO", queue_size=10000, max_bytes=5_000_000,
+                 backup_count=3, batch_size=256, debug_sample_rate=1.0):
+        self.mode = mode.upper()
+        self.queue_handler = None
+        self.listener = None
+
+        if self.mode == "QUEUED":
+            formatter = logging.Formatter(LOG_FORMAT)
+            file_handler = BatchRotatingFileHandler(
+                "bot.log", maxBytes=max_bytes, backupCount=backup_count
+            )
+            stream_handler = logging.StreamHandler()
+            for handler in (file_handler, stream_handler):
+                handler.setFormatter(formatter)
+
+            self.queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+            self.queue_handler.setFormatter(logging.Formatter('%(message)s'))
+            self.queue_handler.addFilter(SamplingFilter(debug_sample_rate))
+            self.listener = BatchingQueueListener(
+                self.queue_handler, [file_handler, stream_handler], batch_size
+            )
+            self.listener.start()
+            handlers = [self.queue_handler]
+        else:
+            handlers = [
                 logging.FileHandler("bot.log"),
                 logging.StreamHandler()
             ]
+
+        logging.basicConfig(
+            level=getattr(logging, level.upper(), logging.INFO),
+            format=LOG_FORMAT,
+            handlers=handlers
         )
         self.logger = logging.getLogger(__name__)
+
+    def stats(self):
+        """Return queue depth and the number of dropped records"""
+        if self.queue_handler is None:
+            return {"mode": self.mode}
+        return {
+            "mode": self.mode,
+            "queued": self.queue_handler.queue.qsize(),
+            "dropped": self.queue_handler.dropped,
+        }
+
+    def stop(self):
+        """Flush pending records and stop the background listener"""
+        if self.listener is not None:
+            self.listener.stop()